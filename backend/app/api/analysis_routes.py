@@ -1,11 +1,18 @@
 # In backend/app/api/analysis_routes.py
 
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Form
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Form, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import Optional, List, Any
+from datetime import datetime
 
 # Import the service instance from the core logic directory
 from ..core.analysis_service import analysis_service_instance, AnalysisService
+from ..core.image_buffer import ImageBuffer, buffer_upload, open_image, UploadTooLargeError, ImageTooLargeError
+from ..core.job_service import job_service_instance, JobService, JobQueueFullError
+from ..core.result_cache import result_cache_instance, ResultCache, etag_matches
+from ..core.admission_control import admission_controller_instance, AdmissionController, AdmissionRejected
+from ..core.credibility_index import normalize_host
 
 # Create a new router for this part of the API
 router = APIRouter()
@@ -33,6 +40,22 @@ class AnalysisResponse(BaseModel):
     linguistic_analysis: Optional[Any] = None
     image_analysis: Optional[Any] = None
     image_authenticity: Optional[Any] = None # Add the new field
+    source_credibility: Optional[Any] = None
+    degraded: bool = False
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str = Field(..., description="One of 'queued', 'running', 'completed', 'failed'.")
+    result: Optional[AnalysisResponse] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 
 # --- Dependency Injection ---
@@ -42,34 +65,214 @@ def get_analysis_service():
     """Provides a singleton instance of the AnalysisService."""
     return analysis_service_instance
 
+def get_job_service():
+    """Provides a singleton instance of the JobService."""
+    return job_service_instance
+
+def get_result_cache():
+    """Provides the shared ResultCache for /analyze responses."""
+    return result_cache_instance
+
+def get_admission_controller():
+    """Provides the shared AdmissionController that guards /analyze."""
+    return admission_controller_instance
+
+
+# --- Helpers ---
+
+def _receive_image(image_file: Optional[UploadFile]) -> Optional[ImageBuffer]:
+    """
+    Exposes an upload as a buffer over the file FastAPI already spooled it to, and
+    rejects decompression bombs from the header before any stage decodes the pixels.
+    This copies or maps the file and parses the header, so call it from a worker thread.
+    """
+    if not image_file:
+        return None
+
+    try:
+        uploaded_image = buffer_upload(image_file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    try:
+        open_image(uploaded_image.view())
+    except ImageTooLargeError as e:
+        uploaded_image.close()
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception:
+        pass # Not a readable image; forensics will report it.
+
+    return uploaded_image
+
+
+def _read_image_bytes(image_file: Optional[UploadFile]) -> Optional[bytes]:
+    """
+    Returns a validated upload as bytes. Jobs persist the image, so it has to be copied
+    out of the spool; like `_receive_image`, call it from a worker thread.
+    """
+    uploaded_image = _receive_image(image_file)
+    if uploaded_image is None:
+        return None
+    try:
+        return bytes(uploaded_image.view())
+    finally:
+        uploaded_image.close()
+
+
+def _client_source(request: Request) -> str:
+    """
+    Where a request came from, for capping its share of the admission queue: the
+    client IP, which unlike the X-Client-Key header the caller cannot choose freely.
+    """
+    return request.client.host if request.client else "anonymous"
+
+
+def _client_key(request: Request, x_client_key: Optional[str]) -> str:
+    """
+    Identifies the caller for fair queueing: an explicit X-Client-Key header
+    (e.g. per extension install or bulk importer), falling back to the client IP.
+    The key is scoped to the IP, so one caller cannot take over another's turn by
+    sending its key.
+    """
+    source = _client_source(request)
+    if x_client_key:
+        return f"{source}/{x_client_key}"
+    return source
+
 
 # --- API Endpoint ---
 # This defines the actual web endpoint that the frontend will call.
 
 @router.post("/analyze", response_model=AnalysisResponse)
 async def analyze_content(
+    request: Request,
+    response: Response,
     service: AnalysisService = Depends(get_analysis_service),
+    result_cache: ResultCache = Depends(get_result_cache),
+    admission: AdmissionController = Depends(get_admission_controller),
     text: Optional[str] = Form(None),
     image_url: Optional[str] = Form(None),
     image_file: Optional[UploadFile] = File(None),
-    image_source_context: Optional[str] = Form(None)
+    image_source_context: Optional[str] = Form(None),
+    explain: bool = Form(False, description="Include token attributions and highlighted phrases."),
+    source_url: Optional[str] = Form(None, description="The URL or hostname of the article, rated by domain against the source credibility index."),
+    if_none_match: Optional[str] = Header(None),
+    x_client_key: Optional[str] = Header(None)
 ):
     """
     Accepts text, an image URL, or a direct image upload for analysis.
+
+    Results are cached by request content and returned with an ETag. A repeat
+    request carrying that ETag in If-None-Match gets a 304 without any model work.
+
+    Cache misses go through admission control; when the server is saturated the
+    request is rejected with 503 and a Retry-After header.
+    """
+    if not text and not image_file and not image_url:
+        raise HTTPException(status_code=400, detail="Please provide text, an image URL, or upload an image file.")
+
+    # Only the domain is rated, so keep the path out of both the analysis and the cache key;
+    # otherwise every article on a site would get its own cache entry.
+    source_url = normalize_host(source_url)
+    # Reading the upload and hashing it (up to MAX_UPLOAD_BYTES) would stall the event loop
+    # that admission control relies on, so both happen on a worker thread.
+    uploaded_image = await run_in_threadpool(_receive_image, image_file)
+
+    try:
+        image_bytes = uploaded_image.view() if uploaded_image else None
+
+        # --- Serve repeat requests from the cache ---
+        cache_key = None
+        if result_cache.enabled:
+            cache_key = await run_in_threadpool(
+                result_cache.make_key, text, image_bytes, image_url, image_source_context,
+                explain=explain, source_url=source_url
+            )
+            cached = result_cache.get(cache_key)
+            if cached:
+                if etag_matches(if_none_match, cached.etag):
+                    return Response(status_code=304, headers={"ETag": cached.etag, "X-Cache": "HIT"})
+                response.headers["ETag"] = cached.etag
+                response.headers["X-Cache"] = "HIT"
+                return cached.payload
+
+        try:
+            async with admission.admit(_client_key(request, x_client_key), _client_source(request)):
+                # analyze_content runs on a worker thread, so the event loop stays free
+                # to queue and shed other requests meanwhile.
+                analysis_result = await service.analyze_content(
+                    text=text,
+                    image_bytes=image_bytes,
+                    image_url=image_url,
+                    image_source_context=image_source_context, # <--- CORRECTED
+                    explain=explain,
+                    source_url=source_url
+                )
+            if cache_key and result_cache.is_cacheable(analysis_result):
+                response.headers["ETag"] = result_cache.put(cache_key, analysis_result)
+            response.headers["X-Cache"] = "MISS"
+            return analysis_result
+        except AdmissionRejected as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        except Exception as e:
+            print(f"An error occurred during analysis: {e}")
+            raise HTTPException(status_code=500, detail=f"An internal server error occurred: {e}")
+    finally:
+        if uploaded_image:
+            uploaded_image.close()
+
+
+@router.get("/analyze/cache/stats")
+async def get_cache_stats(result_cache: ResultCache = Depends(get_result_cache)):
+    """
+    Returns size, TTL and hit-rate counters for the /analyze response cache.
+    """
+    return result_cache.stats()
+
+
+@router.post("/analyze/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_analysis_job(
+    job_service: JobService = Depends(get_job_service),
+    text: Optional[str] = Form(None),
+    image_url: Optional[str] = Form(None),
+    image_file: Optional[UploadFile] = File(None),
+    image_source_context: Optional[str] = Form(None),
+    explain: bool = Form(False, description="Include token attributions and highlighted phrases."),
+    source_url: Optional[str] = Form(None, description="The URL or hostname of the article, rated by domain against the source credibility index.")
+):
+    """
+    Queues the same analysis as /analyze and returns a job ID immediately.
+    Poll GET /analyze/jobs/{job_id} for the result.
+
+    Jobs run on low-priority slots of the /analyze admission controller, so they wait
+    out bursts of interactive traffic instead of being shed. Submissions are refused
+    with 429 only once the job queue itself is full.
     """
     if not text and not image_file and not image_url:
         raise HTTPException(status_code=400, detail="Please provide text, an image URL, or upload an image file.")
 
-    image_bytes = await image_file.read() if image_file else None
+    source_url = normalize_host(source_url)
+    image_data = await run_in_threadpool(_read_image_bytes, image_file)
 
     try:
-        analysis_result = await service.analyze_content(
-        text=text,
-        image_bytes=image_bytes,
-        image_url=image_url,
-        image_source_context=image_source_context # <--- CORRECTED
+        # The insert carries the image (up to MAX_UPLOAD_BYTES), so keep it off the event loop.
+        job_id = await run_in_threadpool(
+            job_service.submit,
+            params={"text": text, "image_url": image_url, "image_source_context": image_source_context,
+                    "explain": explain, "source_url": source_url},
+            image_data=image_data,
         )
-        return analysis_result
-    except Exception as e:
-        print(f"An error occurred during analysis: {e}")
-        raise HTTPException(status_code=500, detail=f"An internal server error occurred: {e}")
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "60"})
+    return JobSubmitResponse(job_id=job_id, status="queued")
+
+
+@router.get("/analyze/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_analysis_job(job_id: str, job_service: JobService = Depends(get_job_service)):
+    """
+    Returns the status of a queued analysis job, and its result once it has completed.
+    """
+    job = await run_in_threadpool(job_service.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or its result has expired.")
+    return job
@@ -0,0 +1,53 @@
+# In backend/app/api/metrics_routes.py
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..core.admission_control import admission_controller_instance
+from ..core.result_cache import result_cache_instance
+
+# Create a new router for this part of the API
+router = APIRouter()
+
+
+def _metric(lines: list, name: str, metric_type: str, help_text: str, samples: dict):
+    """
+    Appends one metric in the Prometheus text exposition format.
+    `samples` maps a label string (e.g. 'reason="queue_full"', or "" for none) to a value.
+    """
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for labels, value in samples.items():
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+
+# --- API Endpoint ---
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Exposes admission control and response cache counters in the Prometheus text format.
+    """
+    admission = admission_controller_instance.stats()
+    cache = result_cache_instance.stats()
+    lines = []
+
+    _metric(lines, "misinfo_admission_limit", "gauge", "Current concurrency limit for /analyze.", {"": admission["limit"]})
+    _metric(lines, "misinfo_admission_inflight", "gauge", "Analyses currently running, analysis jobs included.", {"": admission["inflight"]})
+    _metric(lines, "misinfo_admission_queued", "gauge", "Requests currently waiting for a slot.", {"": admission["queued"]})
+    _metric(lines, "misinfo_admission_background_inflight", "gauge", "Analysis jobs currently holding a slot.", {"": admission["background_inflight"]})
+    _metric(lines, "misinfo_admission_background_queued", "gauge", "Analysis jobs waiting for a slot.", {"": admission["background_queued"]})
+    _metric(lines, "misinfo_admission_latency_ewma_ms", "gauge", "Moving average of /analyze latency.", {"": admission["latency_ewma_ms"]})
+    _metric(lines, "misinfo_admission_admitted_total", "counter", "Requests admitted.", {"": admission["admitted_total"]})
+    _metric(lines, "misinfo_admission_queued_total", "counter", "Requests that had to wait in the queue.", {"": admission["queued_total"]})
+    _metric(
+        lines, "misinfo_admission_shed_total", "counter", "Requests rejected with 503, by reason.",
+        {f'reason="{reason}"': count for reason, count in admission["shed_total"].items()}
+    )
+
+    _metric(lines, "misinfo_result_cache_entries", "gauge", "Entries in the /analyze response cache.", {"": cache["entries"]})
+    _metric(lines, "misinfo_result_cache_hits_total", "counter", "Response cache hits.", {"": cache["hits"]})
+    _metric(lines, "misinfo_result_cache_misses_total", "counter", "Response cache misses.", {"": cache["misses"]})
+    _metric(lines, "misinfo_result_cache_evictions_total", "counter", "Response cache LRU evictions.", {"": cache["evictions"]})
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,48 @@
+# In backend/app/api/request_limits.py
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+
+class RequestBodyLimitMiddleware:
+    """
+    Caps the size of request bodies before anything parses them.
+
+    FastAPI reads and spools the whole multipart body before a route with Form/File
+    parameters runs, so the limit has to be enforced here, at the ASGI level:
+    - a declared Content-Length over the limit is rejected without reading the body;
+    - bodies without one (chunked uploads) are counted as they stream in and cut off
+      with a 413 as soon as they cross the limit.
+    """
+
+    def __init__(self, app, max_body_bytes: int):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    def _detail(self) -> str:
+        return f"Request body exceeds the maximum allowed size of {self.max_body_bytes // (1024 * 1024)} MB."
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            response = JSONResponse({"detail": self._detail()}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    # FastAPI re-raises HTTPExceptions from body parsing, so this becomes a 413.
+                    raise HTTPException(status_code=413, detail=self._detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
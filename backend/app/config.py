@@ -13,7 +13,76 @@ class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./misinformation.db"
     API_V1_STR: str = "/api/v1"
 
+    # Image upload limits
+    # Request bodies over MAX_REQUEST_BODY_BYTES are rejected before they are parsed
+    # (declared Content-Length) or while they stream in (chunked). It leaves 1 MB on top
+    # of MAX_UPLOAD_BYTES for the text fields. Images whose header declares more than
+    # MAX_IMAGE_PIXELS pixels are rejected before they are decoded.
+    MAX_REQUEST_BODY_BYTES: int = 11 * 1024 * 1024
+    MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    UPLOAD_SPOOL_MAX_BYTES: int = 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024
+    MAX_IMAGE_PIXELS: int = 40_000_000
 
+    # Asynchronous job queue (POST /analyze/jobs)
+    # Jobs are persisted through the main database engine and processed by a pool of
+    # JOB_WORKER_CONCURRENCY workers. Each job runs on a low-priority slot of the /analyze
+    # admission controller (see below), so interactive requests are always served first.
+    # Jobs only start while two slots are free, so they never run at a limit of 1.
+    # Finished jobs are deleted after JOB_RESULT_TTL_SECONDS.
+    # Submissions are refused with 429 once JOB_MAX_QUEUED jobs are waiting.
+    # A claimed job holds a JOB_LEASE_SECONDS lease that its worker keeps renewing; any
+    # process re-queues running jobs whose lease has lapsed (e.g. their process died).
+    JOB_WORKER_CONCURRENCY: int = 2
+    JOB_MAX_QUEUED: int = 1000
+    JOB_RESULT_TTL_SECONDS: int = 3600
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    JOB_LEASE_SECONDS: float = 120.0
+
+    # Response cache for /analyze
+    # Results are keyed by a hash of the normalized text, the image content and the
+    # source context, and served with an ETag so clients can revalidate with If-None-Match.
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_TTL_SECONDS: int = 900
+
+    # Token attributions for the sentiment stage (opt-in per request with explain=true)
+    # Attributions are gradient x input on the same forward pass that produces the
+    # sentiment label. The backward pass costs roughly twice the forward pass, so it is
+    # skipped when that estimate would exceed ATTRIBUTION_LATENCY_BUDGET_MS.
+    ATTRIBUTION_LATENCY_BUDGET_MS: float = 300.0
+    ATTRIBUTION_TOP_K: int = 5
+
+    # Image-only requests: send the image to Gemini once and get the forensic verdict,
+    # the generated claim and the fact-check back in one structured response, instead of
+    # three sequential calls. Falls back to the separate calls if the combined one fails.
+    GEMINI_COMBINED_IMAGE_MODE: bool = True
+
+    # Admission control for /analyze
+    # At most the current concurrency limit of analyses run at once; the rest wait in a
+    # short, per-client round-robin queue and are shed with 503 + Retry-After once it is
+    # full or the wait times out. With ADMISSION_ADAPTIVE, the limit moves between the
+    # min and max (AIMD) depending on whether latency stays under the target.
+    # Clients are told apart by their X-Client-Key header (the extension sends a key per
+    # install) within their IP; since keys are self-declared, one IP can hold at most
+    # ADMISSION_QUEUE_PER_SOURCE queued requests across all of its keys. Behind a reverse
+    # proxy, run uvicorn with --proxy-headers so the client IP is the real one.
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_INITIAL_CONCURRENCY: int = 4
+    ADMISSION_MIN_CONCURRENCY: int = 1
+    ADMISSION_MAX_CONCURRENCY: int = 8
+    ADMISSION_QUEUE_SIZE: int = 16
+    ADMISSION_QUEUE_PER_CLIENT: int = 4
+    ADMISSION_QUEUE_PER_SOURCE: int = 8
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    ADMISSION_ADAPTIVE: bool = True
+    ADMISSION_TARGET_LATENCY_MS: float = 10000.0
+
+    # Local source-credibility index (built with build_credibility_index.py)
+    # The file is memory-mapped at startup and re-opened when it changes on disk,
+    # checked at most every CREDIBILITY_INDEX_RELOAD_SECONDS.
+    CREDIBILITY_INDEX_PATH: str = "./data/credibility.idx"
+    CREDIBILITY_INDEX_RELOAD_SECONDS: float = 30.0
 
     # CORS (Cross-Origin Resource Sharing) configuration
     # This determines which frontend origins are allowed to communicate with the API.
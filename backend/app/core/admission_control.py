@@ -0,0 +1,315 @@
+# In backend/app/core/admission_control.py
+import asyncio
+import math
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from ..config import get_settings
+
+settings = get_settings()
+
+# Bounds for the Retry-After hint sent with a 503.
+MIN_RETRY_AFTER_SECONDS = 1
+MAX_RETRY_AFTER_SECONDS = 30
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server is overloaded ({reason}). Please retry in {retry_after} seconds.")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Limits how many analyses run at once and sheds load when saturated.
+
+    Requests beyond the concurrency limit wait in a short queue. The queue is split
+    per client key and served round-robin, so a single bulk caller cannot starve
+    everyone else. Client keys are declared by the caller, so the share of the queue
+    one source (the client IP) can hold across all of its keys is capped as well.
+    Once the queue is full, or a request has waited longer than the queue timeout,
+    it is rejected so the caller can back off and retry.
+
+    When adaptive, the limit follows AIMD: it grows by roughly one slot per window of
+    requests that finish under the target latency, and shrinks by 10% whenever one
+    finishes over it.
+
+    Background work (the analysis job queue) takes slots from the same limit, but at a
+    lower priority: it is never shed, only gets a slot when no interactive request is
+    waiting and at least two slots are free, so one is always left for interactive
+    traffic (at a limit of 1 no background work runs at all). Its latency is not fed
+    into AIMD, so long jobs do not shrink the interactive limit. Once interactive
+    traffic stops, a limit that AIMD shrank is restored to its initial value, since
+    there is nothing left to measure and jobs would otherwise wait forever.
+
+    All state is only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        initial_concurrency: int,
+        min_concurrency: int,
+        max_concurrency: int,
+        queue_size: int,
+        queue_per_client: int,
+        queue_timeout_seconds: float,
+        target_latency_ms: float,
+        adaptive: bool = True,
+        enabled: bool = True,
+        queue_per_source: Optional[int] = None,
+    ):
+        self.enabled = enabled
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.queue_size = queue_size
+        self.queue_per_client = queue_per_client
+        self.queue_per_source = queue_size if queue_per_source is None else queue_per_source
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.target_latency_ms = target_latency_ms
+        self.adaptive = adaptive
+
+        self._initial_limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self._limit = self._initial_limit
+        self._inflight = 0
+        self._waiters: "OrderedDict[str, deque]" = OrderedDict()
+        self._queued = 0
+        self._queued_by_source: Counter = Counter()
+        self._waiter_sources = {}
+        self._background_inflight = 0
+        self._background_waiters: deque = deque()
+        self._latency_ewma_ms = 0.0
+
+        # Counters exported as metrics
+        self._admitted_total = 0
+        self._queued_total = 0
+        self._shed_total = {"queue_full": 0, "client_queue_full": 0, "source_queue_full": 0, "queue_timeout": 0}
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    # --- Admission ---
+
+    @asynccontextmanager
+    async def admit(self, client_key: str, source: Optional[str] = None):
+        """
+        Holds a concurrency slot for the duration of the block. `source` is where the
+        request came from (the client IP); it defaults to the client key.
+        Raises AdmissionRejected if the request is shed.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        await self.acquire(client_key, source)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release((time.monotonic() - started) * 1000)
+
+    @asynccontextmanager
+    async def admit_background(self):
+        """
+        Holds a low-priority slot for background work for the duration of the block.
+        Waits for as long as it takes instead of being shed.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        await self.acquire_background()
+        try:
+            yield
+        finally:
+            self.release_background()
+
+    async def acquire(self, client_key: str, source: Optional[str] = None):
+        if self._inflight < self.limit and self._queued == 0:
+            self._inflight += 1
+            self._admitted_total += 1
+            return
+
+        if self._queued >= self.queue_size:
+            self._shed("queue_full")
+        client_waiters = self._waiters.get(client_key)
+        if client_waiters is not None and len(client_waiters) >= self.queue_per_client:
+            self._shed("client_queue_full")
+        source = client_key if source is None else source
+        if self._queued_by_source[source] >= self.queue_per_source:
+            self._shed("source_queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(client_key, deque()).append(waiter)
+        self._waiter_sources[waiter] = source
+        self._queued_by_source[source] += 1
+        self._queued += 1
+        self._queued_total += 1
+
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return # Granted just as the timeout fired
+            self._remove_waiter(client_key, waiter)
+            self._shed("queue_timeout")
+        except asyncio.CancelledError:
+            # The client went away while queued. Give back a slot if one was already granted.
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)
+            else:
+                self._remove_waiter(client_key, waiter)
+            raise
+
+    def release(self, latency_ms):
+        """
+        Frees a slot, feeds the observed latency into the limit, and admits queued requests.
+        """
+        self._inflight -= 1
+        if latency_ms is not None:
+            self._record_latency(latency_ms)
+        self._dispatch()
+
+    def _background_admissible(self) -> bool:
+        # Counts every slot in use, so jobs already running after the limit shrank
+        # hold back new ones, and one slot always stays free for interactive requests.
+        return self._queued == 0 and self._inflight < self.limit - 1
+
+    def _restore_limit_if_idle(self):
+        # Without interactive traffic there is no latency to grow the limit back,
+        # so forget the overload instead of leaving background work stuck behind it.
+        if self._queued == 0 and self._inflight == self._background_inflight:
+            self._limit = max(self._limit, self._initial_limit)
+
+    async def acquire_background(self):
+        self._restore_limit_if_idle()
+        if not self._background_waiters and self._background_admissible():
+            self._inflight += 1
+            self._background_inflight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._background_waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release_background()
+            elif waiter in self._background_waiters:
+                self._background_waiters.remove(waiter)
+            raise
+
+    def release_background(self):
+        """Frees a background slot. Its latency is deliberately not recorded."""
+        self._inflight -= 1
+        self._background_inflight -= 1
+        self._dispatch()
+
+    def _record_latency(self, latency_ms: float):
+        if self._latency_ewma_ms == 0.0:
+            self._latency_ewma_ms = latency_ms
+        else:
+            self._latency_ewma_ms = 0.8 * self._latency_ewma_ms + 0.2 * latency_ms
+
+        if not self.adaptive:
+            return
+        if latency_ms > self.target_latency_ms:
+            self._limit = max(self.min_concurrency, self._limit * 0.9)
+        else:
+            self._limit = min(self.max_concurrency, self._limit + 1.0 / self._limit)
+
+    def _dispatch(self):
+        """
+        Grants free slots to queued requests, one client at a time in round-robin order.
+        Background work only gets what is left once no interactive request is waiting.
+        """
+        while self._queued and self._inflight < self.limit:
+            client_key, client_waiters = next(iter(self._waiters.items()))
+            waiter = client_waiters.popleft()
+            self._unqueue(waiter)
+            if client_waiters:
+                self._waiters.move_to_end(client_key)
+            else:
+                del self._waiters[client_key]
+
+            if waiter.done():
+                continue
+            self._inflight += 1
+            self._admitted_total += 1
+            waiter.set_result(None)
+
+        self._restore_limit_if_idle()
+        while self._background_waiters and self._background_admissible():
+            waiter = self._background_waiters.popleft()
+            if waiter.done():
+                continue
+            self._inflight += 1
+            self._background_inflight += 1
+            waiter.set_result(None)
+
+    def _remove_waiter(self, client_key: str, waiter):
+        client_waiters = self._waiters.get(client_key)
+        if client_waiters is None or waiter not in client_waiters:
+            return
+        client_waiters.remove(waiter)
+        self._unqueue(waiter)
+        if not client_waiters:
+            del self._waiters[client_key]
+
+    def _unqueue(self, waiter):
+        self._queued -= 1
+        source = self._waiter_sources.pop(waiter)
+        self._queued_by_source[source] -= 1
+        if not self._queued_by_source[source]:
+            del self._queued_by_source[source]
+
+    def _shed(self, reason: str):
+        self._shed_total[reason] += 1
+        raise AdmissionRejected(reason, self.retry_after())
+
+    def retry_after(self) -> int:
+        """
+        Estimates how long until a slot frees up: the queue ahead, drained at the
+        current limit, at the observed average latency.
+        """
+        latency_seconds = self._latency_ewma_ms / 1000 if self._latency_ewma_ms else 1.0
+        estimate = math.ceil(latency_seconds * (self._queued + 1) / max(1, self.limit))
+        return min(MAX_RETRY_AFTER_SECONDS, max(MIN_RETRY_AFTER_SECONDS, estimate))
+
+    # --- Observability ---
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "limit": self.limit,
+            "inflight": self._inflight,
+            "background_inflight": self._background_inflight,
+            "queued": self._queued,
+            "background_queued": len(self._background_waiters),
+            "queued_clients": len(self._waiters),
+            "queued_sources": len(self._queued_by_source),
+            "latency_ewma_ms": round(self._latency_ewma_ms, 1),
+            "admitted_total": self._admitted_total,
+            "queued_total": self._queued_total,
+            "shed_total": dict(self._shed_total),
+        }
+
+
+# Create a single, reusable instance of the controller.
+admission_controller_instance = AdmissionController(
+    initial_concurrency=settings.ADMISSION_INITIAL_CONCURRENCY,
+    min_concurrency=settings.ADMISSION_MIN_CONCURRENCY,
+    max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    queue_per_client=settings.ADMISSION_QUEUE_PER_CLIENT,
+    queue_per_source=settings.ADMISSION_QUEUE_PER_SOURCE,
+    queue_timeout_seconds=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    target_latency_ms=settings.ADMISSION_TARGET_LATENCY_MS,
+    adaptive=settings.ADMISSION_ADAPTIVE,
+    enabled=settings.ADMISSION_CONTROL_ENABLED,
+)
@@ -1,21 +1,24 @@
-import requests
-from PIL import Image
-import requests
 from transformers import pipeline, CLIPProcessor, CLIPModel
 import torch
-from typing import Optional
+import time
+from typing import Optional, List, Tuple
+from fastapi.concurrency import run_in_threadpool
+from ..config import get_settings
 from .gemini_service import gemini_service_instance
 from transformers import AutoImageProcessor, AutoModelForImageClassification
-import io # For handling image bytes
 from .forensics_service import forensics_service_instance
+from .image_buffer import spool_url, open_image, ImageData
 
 # Import the explainability service we just created
 from .explainability_service import explainability_service_instance
+from .credibility_service import credibility_service_instance
 
 # --- Model Loading ---
 # Models are loaded once when the application starts to ensure fast API responses.
 # The first time the app runs, these models will be downloaded (can be several GB).
 
+settings = get_settings()
+
 print("Loading text analysis pipeline...")
 # Using a sentiment model as a proxy for detecting sensationalized/emotive language.
 text_analyzer = pipeline(
@@ -45,38 +48,108 @@ class AnalysisService:
     Service to perform the core AI/ML analysis on text and image content.
     """
 
-    def _analyze_text(self, text: str) -> dict:
+    def _run_sentiment(self, text: str, with_attributions: bool = False) -> Tuple[dict, Optional[dict]]:
+        """
+        Runs the sentiment model once and, if requested, derives gradient x input
+        token attributions from that same forward pass.
+        Returns the sentiment ({label, score}) and the attribution details, if any.
+        """
+        tokenizer, model = text_analyzer.tokenizer, text_analyzer.model
+        encoded = tokenizer(text, return_tensors="pt", return_offsets_mapping=with_attributions)
+        offsets = encoded.pop("offset_mapping", None)
+
+        if not with_attributions:
+            with torch.no_grad():
+                logits = model(**encoded).logits
+            probabilities = logits.softmax(dim=-1)[0]
+            label_id = int(probabilities.argmax())
+            return {"label": model.config.id2label[label_id], "score": float(probabilities[label_id])}, None
+
+        # Feed the embeddings in directly so the gradient can be taken with respect to them.
+        forward_start = time.perf_counter()
+        embeddings = model.get_input_embeddings()(encoded["input_ids"]).detach().requires_grad_(True)
+        logits = model(inputs_embeds=embeddings, attention_mask=encoded["attention_mask"]).logits
+        probabilities = logits.softmax(dim=-1)[0]
+        label_id = int(probabilities.argmax())
+        sentiment = {"label": model.config.id2label[label_id], "score": float(probabilities[label_id])}
+        forward_ms = (time.perf_counter() - forward_start) * 1000
+
+        if forward_ms * 2 > settings.ATTRIBUTION_LATENCY_BUDGET_MS:
+            print(f"Skipping token attributions: forward pass took {forward_ms:.1f} ms.")
+            return sentiment, {"tokens": [], "latency_ms": 0.0, "skipped": "latency budget exceeded"}
+
+        attribution_start = time.perf_counter()
+        # torch.autograd.grad leaves the shared model's parameter gradients untouched.
+        (gradient,) = torch.autograd.grad(logits[0, label_id], embeddings)
+        token_scores = (gradient * embeddings).sum(dim=-1)[0].detach().tolist()
+        tokens = self._merge_subword_attributions(text, offsets[0].tolist(), token_scores)
+        latency_ms = (time.perf_counter() - attribution_start) * 1000
+
+        return sentiment, {"tokens": tokens, "latency_ms": round(latency_ms, 2)}
+
+    @staticmethod
+    def _merge_subword_attributions(text: str, offsets: List[List[int]], scores: List[float]) -> List[dict]:
+        """
+        Sums subword scores into whole words using the tokenizer's character offsets,
+        and scales them so the strongest word has a magnitude of 1.0.
+        Positive scores pushed the model towards its predicted label.
+        """
+        words = []
+        for (start, end), score in zip(offsets, scores):
+            if start == end:
+                continue # Special tokens like [CLS] and [SEP] have empty spans
+            if words and start == words[-1]["end"]:
+                words[-1]["end"] = end
+                words[-1]["score"] += score
+            else:
+                words.append({"start": start, "end": end, "score": score})
+
+        peak = max((abs(word["score"]) for word in words), default=0.0) or 1.0
+        for word in words:
+            word["text"] = text[word["start"]:word["end"]]
+            word["score"] = round(word["score"] / peak, 4)
+        return words
+
+    def _analyze_text(self, text: str, include_attributions: bool = False) -> dict:
         """
         Analyzes text for cues of misinformation, like high negative sentiment.
-        Returns a dictionary with a raw score and an explanation flag.
+        Returns a dictionary with a raw score and an explanation flag, plus
+        word-level attributions when `include_attributions` is set.
         """
         try:
             # Truncate text to the model's max input size to avoid errors
             truncated_text = text[:512]
-            results = text_analyzer(truncated_text)
-            sentiment = results[0]
+            sentiment, attributions = self._run_sentiment(truncated_text, with_attributions=include_attributions)
 
             # Heuristic: Highly negative content is often sensationalized.
             if sentiment['label'] == 'NEGATIVE' and sentiment['score'] > 0.8:
-                return {"score": 0.3, "flag": "The text exhibits strong negative sentiment, which can be a sign of emotive or biased language."}
+                result = {"score": 0.3, "flag": "The text exhibits strong negative sentiment, which can be a sign of emotive or biased language."}
             else:
-                return {"score": 0.7, "flag": "The text's tone appears to be neutral."}
+                result = {"score": 0.7, "flag": "The text's tone appears to be neutral."}
+
+            if attributions is not None:
+                result["attributions"] = attributions
+            return result
         except Exception as e:
             print(f"Error in text analysis: {e}")
-            return {"score": 0.5, "flag": "Text analysis could not be completed."}
+            return {"score": 0.5, "flag": "Text analysis could not be completed.", "error": str(e)}
 
-    def _match_image_with_text(self, image_url: str, text: str) -> dict:
+    def _match_image_with_text(self, image_url: str, text: str, image_data: Optional[ImageData] = None) -> dict:
         """
         Uses CLIP to score the semantic similarity between an image URL and text.
+        If the URL has already been downloaded, its buffered data can be passed in
+        as `image_data` to avoid fetching it a second time.
         Returns a dictionary with a score, match status, and an explanation flag.
         """
         try:
-            response = requests.get(image_url, stream=True, timeout=15)
-            response.raise_for_status()
-            image = Image.open(response.raw).convert("RGB")
+            if image_data is not None:
+                image = open_image(image_data).convert("RGB")
+            else:
+                with spool_url(image_url, timeout=15) as downloaded:
+                    image = open_image(downloaded.view()).convert("RGB")
         except Exception as e:
             print(f"Error fetching or processing image URL '{image_url}': {e}")
-            return {"match": False, "score": 0.0, "flag": "The provided image could not be processed."}
+            return {"match": False, "score": 0.0, "flag": "The provided image could not be processed.", "error": str(e)}
 
         inputs = clip_processor(text=[text[:77]], images=image, return_tensors="pt", padding=True)
 
@@ -93,46 +166,113 @@ class AnalysisService:
             return {"match": False, "score": 0.2, "flag": "The main image does not seem to match the content of the text."}
 
 
-    async def analyze_content(self, text: Optional[str] = None, image_bytes: Optional[bytes] = None, image_url: Optional[str] = None, image_source_context: Optional[str] = None) -> dict:
+    async def analyze_content(self, text: Optional[str] = None, image_bytes: Optional[ImageData] = None, image_url: Optional[str] = None, image_source_context: Optional[str] = None, explain: bool = False, source_url: Optional[str] = None) -> dict:
+        """
+        Runs `run_analysis` on a worker thread. Every stage makes blocking model or
+        Gemini calls, so this keeps the event loop free while the analysis runs.
+        """
+        return await run_in_threadpool(
+            self.run_analysis,
+            text=text,
+            image_bytes=image_bytes,
+            image_url=image_url,
+            image_source_context=image_source_context,
+            explain=explain,
+            source_url=source_url,
+        )
+
+    def run_analysis(self, text: Optional[str] = None, image_bytes: Optional[ImageData] = None, image_url: Optional[str] = None, image_source_context: Optional[str] = None, explain: bool = False, source_url: Optional[str] = None) -> dict:
+        """
+        Runs the full analysis synchronously; call it from a worker thread.
+        `image_bytes` may be raw bytes or a zero-copy memoryview of a spooled upload.
+        With `explain`, the text analysis also returns token attributions and the
+        phrases that drove its result.
+        `source_url` is the article's URL, rated against the local credibility index
+        along with every source Gemini cites.
+        The payload's `degraded` flag is set whenever a stage failed and its result
+        was replaced by a fallback, so callers can tell a partial result from a full one.
+        """
     # --- Initialize result containers ---
         linguistic_analysis = None
         image_analysis = None
         image_authenticity_analysis = None
         gemini_result = None
         final_payload = {}
+        failed_stages = []
 
         # Prioritize uploaded image bytes, but if only a URL is given, download the image.
+        # Downloads are spooled the same way as uploads, so they are size-limited too.
         effective_image_bytes = image_bytes
+        downloaded_image = None
         if not effective_image_bytes and image_url:
             print(f"Downloading image from URL: {image_url}")
             try:
-                response = requests.get(image_url, timeout=10)
-                response.raise_for_status() # Raise an exception for bad status codes
-                effective_image_bytes = response.content
+                downloaded_image = spool_url(image_url, timeout=10)
+                effective_image_bytes = downloaded_image.view()
                 print("Image downloaded successfully.")
             except Exception as e:
                 print(f"Failed to download image from URL: {e}")
                 # Create a specific error message for the frontend
                 image_authenticity_analysis = {"error": "The provided image URL could not be downloaded or is invalid."}
+                failed_stages.append("image_download")
+
+        try:
+            # --- Image-only requests: one combined Gemini call instead of three ---
+            combined_result = None
+            if not text and effective_image_bytes and not image_authenticity_analysis and settings.GEMINI_COMBINED_IMAGE_MODE:
+                combined_result = gemini_service_instance.analyze_image_combined(effective_image_bytes)
+                if "error" in combined_result:
+                    print(f"Combined image analysis failed, falling back to separate calls: {combined_result['error']}")
+                    combined_result = None
 
-        # --- Perform Image Forensics if we have image data (either uploaded or downloaded) ---
-        if effective_image_bytes and not image_authenticity_analysis:
-            image_authenticity_analysis = forensics_service_instance.analyze_image_authenticity(effective_image_bytes, source_context=image_source_context or 'unknown')
+            # --- Perform Image Forensics if we have image data (either uploaded or downloaded) ---
+            if effective_image_bytes and not image_authenticity_analysis:
+                image_authenticity_analysis = forensics_service_instance.analyze_image_authenticity(
+                    effective_image_bytes,
+                    source_context=image_source_context or 'unknown',
+                    vision_result=combined_result["forensics"] if combined_result else None
+                )
+                # The Gemini Vision error is nested in the forensics result rather than raised,
+                # and a vision result without a verdict surfaces as the "Error" verdict.
+                visual_analysis = image_authenticity_analysis.get("visual_analysis")
+                if ("error" in image_authenticity_analysis
+                        or image_authenticity_analysis.get("verdict") == "Error"
+                        or (isinstance(visual_analysis, dict) and "error" in visual_analysis)):
+                    failed_stages.append("image_forensics")
 
-        # --- Determine the primary claim for Gemini ---
-        primary_claim = text
-        if not text and effective_image_bytes:
-            primary_claim = gemini_service_instance.describe_image_for_claim(effective_image_bytes)
-            print(f"Generated claim from image: {primary_claim}")
+            # --- Determine the primary claim for Gemini ---
+            primary_claim = text
+            if not text and effective_image_bytes:
+                if combined_result:
+                    primary_claim = combined_result["claim"]
+                else:
+                    primary_claim = gemini_service_instance.describe_image_for_claim(effective_image_bytes)
+                    if primary_claim.startswith("Error"):
+                        failed_stages.append("image_claim")
+                print(f"Generated claim from image: {primary_claim}")
 
-        # --- Perform Text-based Analyses if a claim exists ---
-        if primary_claim:
-            linguistic_analysis = self._analyze_text(primary_claim)
-            gemini_result = gemini_service_instance.verify_claim(primary_claim)
+            # --- Perform Text-based Analyses if a claim exists ---
+            if primary_claim:
+                linguistic_analysis = self._analyze_text(primary_claim, include_attributions=explain)
+                if "error" in linguistic_analysis:
+                    failed_stages.append("text_analysis")
+                if combined_result:
+                    gemini_result = combined_result["fact_check"]
+                else:
+                    gemini_result = gemini_service_instance.verify_claim(primary_claim)
+                if "error" in gemini_result:
+                    failed_stages.append("fact_check")
 
-        # --- Perform Image-Text Coherence (if applicable) ---
-        if primary_claim and image_url: # This check remains URL-based
-            image_analysis = self._match_image_with_text(image_url, primary_claim)
+            # --- Perform Image-Text Coherence (if applicable) ---
+            if primary_claim and image_url: # This check remains URL-based
+                # Reuse the downloaded image instead of fetching the URL a second time.
+                url_image_data = downloaded_image.view() if downloaded_image else None
+                image_analysis = self._match_image_with_text(image_url, primary_claim, image_data=url_image_data)
+                if "error" in image_analysis:
+                    failed_stages.append("image_text_match")
+        finally:
+            if downloaded_image:
+                downloaded_image.close()
 
         # --- Combine all results into the final payload ---
         if gemini_result and "error" not in gemini_result:
@@ -145,9 +285,27 @@ class AnalysisService:
                 "correction": None, "enrichment": [], "sources": []
             }
 
+        # --- Score the article and cited sources against the local credibility index ---
+        source_credibility = credibility_service_instance.score_request(source_url, final_payload.get("sources"))
+        source_credibility["summary"] = explainability_service_instance.describe_source_credibility(source_credibility)
+
+        # --- Explain which phrases drove the text analysis (if requested) ---
+        if explain and linguistic_analysis:
+            highlights = explainability_service_instance.highlight_phrases(
+                linguistic_analysis.get("attributions"), top_k=settings.ATTRIBUTION_TOP_K
+            )
+            linguistic_analysis["highlights"] = highlights
+            linguistic_analysis["explanation"] = explainability_service_instance.generate_explanation(
+                linguistic_analysis, image_analysis, highlights, source_credibility
+            )
+
         final_payload['linguistic_analysis'] = linguistic_analysis
         final_payload['image_analysis'] = image_analysis
         final_payload['image_authenticity'] = image_authenticity_analysis
+        final_payload['source_credibility'] = source_credibility
+        final_payload['degraded'] = bool(failed_stages)
+        if failed_stages:
+            print(f"Analysis degraded; failed stages: {', '.join(failed_stages)}")
 
         return final_payload    
 
@@ -0,0 +1,310 @@
+# In backend/app/core/credibility_index.py
+"""
+A compact, memory-mapped domain reputation index.
+
+The index is built offline (see build_credibility_index.py) from a CSV or JSON list
+of domains and scores, together with a snapshot of the Public Suffix List
+(https://publicsuffix.org), which decides where a host's registrable domain begins.
+At runtime it is opened with mmap, so loading is O(1) no matter how many domains it
+holds, and lookups are a binary search over sorted, fixed-size records.
+
+File layout (little endian):
+    header    magic "CRIX", version, label count, entry count, entries offset, names offset,
+              suffix rule count, suffix rules offset
+    labels    label count x (u8 length, utf-8 bytes)
+    entries   entry count x (u32 name offset, u16 name length, u8 label index, pad, f32 score)
+    suffixes  suffix rule count x (u32 name offset, u16 name length)
+    names     concatenated utf-8 domain names, then suffix rules, each in sorted order
+"""
+import csv
+import json
+import mmap
+import os
+import struct
+import tempfile
+from typing import Container, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+MAGIC = b"CRIX"
+VERSION = 2
+HEADER = struct.Struct("<4sHHIIIII")
+ENTRY = struct.Struct("<IHBxf")
+SUFFIX_RULE = struct.Struct("<IH")
+
+# The Public Suffix List snapshot embedded into indexes by default. Refresh it from
+# https://publicsuffix.org/list/public_suffix_list.dat and rebuild the index.
+DEFAULT_PUBLIC_SUFFIX_LIST = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "public_suffix_list.dat")
+)
+
+
+class CredibilityRating(NamedTuple):
+    domain: str          # The domain looked up (normalized host)
+    matched_domain: str  # The index entry that matched (the host itself or a parent)
+    score: float         # 0.0 (not credible) to 1.0 (highly credible)
+    label: str
+
+
+def normalize_host(url_or_domain: str) -> Optional[str]:
+    """
+    Extracts a lowercase hostname from a URL or bare domain, dropping ports,
+    credentials, a trailing dot and a leading 'www.'.
+    """
+    if not url_or_domain:
+        return None
+    value = url_or_domain.strip()
+    if "//" not in value:
+        value = "//" + value
+    try:
+        host = urlsplit(value).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    host = host.rstrip(".").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host or None
+
+
+def public_suffix(host: str, rules: Container[str]) -> str:
+    """
+    Returns the public suffix of a host under Public Suffix List rules: the longest
+    matching rule wins, '*.' rules match any one label, '!' rules carve exceptions out
+    of a wildcard, and a host no rule matches ends in a single-label suffix.
+    """
+    labels = host.split(".")
+    for i in range(len(labels)):
+        suffix = ".".join(labels[i:])
+        if "!" + suffix in rules:
+            return ".".join(labels[i + 1:])
+        if suffix in rules or (i + 1 < len(labels) and "*." + ".".join(labels[i + 1:]) in rules):
+            return suffix
+    return labels[-1]
+
+
+def registrable_domain(host: str, rules: Container[str]) -> str:
+    """
+    Returns the registrable domain of a host: its public suffix plus one label, e.g.
+    'news.example.co.uk' -> 'example.co.uk' or 'user.github.io' -> 'user.github.io'.
+    A host that is itself a public suffix is returned unchanged.
+    """
+    labels = host.split(".")
+    suffix_length = len(public_suffix(host, rules).split("."))
+    return ".".join(labels[-min(len(labels), suffix_length + 1):])
+
+
+def candidate_domains(host: str, rules: Container[str]) -> List[str]:
+    """
+    The host followed by each parent domain down to its registrable domain,
+    most specific first, so specific subdomain entries win over the parent's.
+    """
+    labels = host.split(".")
+    floor = len(registrable_domain(host, rules).split("."))
+    return [".".join(labels[i:]) for i in range(0, max(1, len(labels) - floor + 1))]
+
+
+def _search(buffer, table_offset: int, record: struct.Struct, count: int, names_offset: int, key: bytes) -> Optional[tuple]:
+    """
+    Binary-searches a table of fixed-size records, sorted by the name each one points
+    to (a u32 offset and u16 length into the names section). Returns the record or None.
+    """
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        found = record.unpack_from(buffer, table_offset + middle * record.size)
+        start = names_offset + found[0]
+        name = buffer[start:start + found[1]]
+        if name < key:
+            low = middle + 1
+        elif name > key:
+            high = middle
+        else:
+            return found
+    return None
+
+
+class SuffixRules:
+    """
+    The Public Suffix List rules embedded in an index, searched in place in the mapping.
+    Supports `rule in rules`, so it can be passed anywhere a set of rules is accepted.
+    """
+
+    def __init__(self, buffer, table_offset: int, count: int, names_offset: int):
+        self._buffer = buffer
+        self._table_offset = table_offset
+        self._count = count
+        self._names_offset = names_offset
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, rule: str) -> bool:
+        key = rule.encode("utf-8")
+        return _search(self._buffer, self._table_offset, SUFFIX_RULE, self._count, self._names_offset, key) is not None
+
+
+class CredibilityIndex:
+    """
+    Read-only view over an index file. Opening it only maps the file and reads the header.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, label_count, self._count, self._entries_offset, self._names_offset,
+         suffix_count, suffixes_offset) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a version {VERSION} credibility index; rebuild it with build_credibility_index.py.")
+        self.suffix_rules = SuffixRules(self._mmap, suffixes_offset, suffix_count, self._names_offset)
+
+        self._labels = []
+        offset = HEADER.size
+        for _ in range(label_count):
+            length = self._mmap[offset]
+            self._labels.append(self._mmap[offset + 1:offset + 1 + length].decode("utf-8"))
+            offset += 1 + length
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get_exact(self, domain: str) -> Optional[Tuple[float, str]]:
+        """Binary-searches for an exact domain. Returns (score, label) or None."""
+        found = _search(self._mmap, self._entries_offset, ENTRY, self._count, self._names_offset, domain.encode("utf-8"))
+        if found is None:
+            return None
+        _, _, label_index, score = found
+        return score, self._labels[label_index]
+
+    def lookup(self, url_or_domain: str) -> Optional[CredibilityRating]:
+        """
+        Rates a URL or domain by its most specific entry in the index, falling back
+        from subdomains to the registrable domain, but never past it: a site on a
+        shared host such as blogspot.com is not rated as the host itself.
+        """
+        host = normalize_host(url_or_domain)
+        if not host:
+            return None
+        for candidate in candidate_domains(host, self.suffix_rules):
+            found = self.get_exact(candidate)
+            if found:
+                score, label = found
+                return CredibilityRating(domain=host, matched_domain=candidate, score=round(score, 4), label=label)
+        return None
+
+
+# --- Building ---
+
+def load_public_suffix_list(path: str) -> Set[str]:
+    """
+    Reads the rules of a Public Suffix List file. Rules for internationalized domains
+    are kept in both their Unicode and their ASCII (punycode) form, since hosts can
+    arrive in either.
+    """
+    rules = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("//"):
+                continue
+            rule = line.split()[0].lower()
+            rules.add(rule)
+            if not rule.isascii():
+                prefix = next((prefix for prefix in ("!", "*.") if rule.startswith(prefix)), "")
+                try:
+                    rules.add(prefix + rule[len(prefix):].encode("idna").decode("ascii"))
+                except UnicodeError:
+                    pass # Not valid IDNA 2003, so such hosts only ever arrive in Unicode
+    return rules
+
+
+def load_ratings(path: str) -> Dict[str, Tuple[float, str]]:
+    """
+    Reads domain ratings from a CSV (columns: domain, score, optional label) or a
+    JSON file (a list of {domain, score, label} objects, or a {domain: score} mapping).
+    Later duplicates override earlier ones.
+    """
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            rows = [{"domain": domain, "score": score} for domain, score in data.items()]
+        else:
+            rows = data
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+
+    ratings = {}
+    for row in rows:
+        host = normalize_host(str(row.get("domain", "")))
+        if not host:
+            continue
+        score = float(row["score"])
+        if not 0.0 <= score <= 1.0:
+            raise ValueError(f"Score for {host} must be between 0.0 and 1.0, got {score}.")
+        ratings[host] = (score, (row.get("label") or "unrated").strip())
+    return ratings
+
+
+def write_index(ratings: Dict[str, Tuple[float, str]], path: str, suffix_rules: Iterable[str] = ()) -> None:
+    """
+    Writes an index file atomically: the new file is renamed over the old one, so a
+    running server either sees the old index or the new one, never a partial file.
+    """
+    labels = sorted({label for _, label in ratings.values()})
+    if len(labels) > 255:
+        raise ValueError("A credibility index supports at most 255 distinct labels.")
+    label_ids = {label: i for i, label in enumerate(labels)}
+
+    encoded_labels = [label.encode("utf-8") for label in labels]
+    for label, encoded in zip(labels, encoded_labels):
+        if len(encoded) > 255:
+            raise ValueError(f"Label '{label[:40]}...' is {len(encoded)} bytes long; labels are limited to 255 bytes.")
+    label_table = b"".join(bytes([len(encoded)]) + encoded for encoded in encoded_labels)
+    items = sorted((domain.encode("utf-8"), score, label) for domain, (score, label) in ratings.items())
+    rules = sorted({rule.encode("utf-8") for rule in suffix_rules})
+
+    entries_offset = HEADER.size + len(label_table)
+    suffixes_offset = entries_offset + ENTRY.size * len(items)
+    names_offset = suffixes_offset + SUFFIX_RULE.size * len(rules)
+
+    entries, suffixes, names = bytearray(), bytearray(), bytearray()
+    for name, score, label in items:
+        entries += ENTRY.pack(len(names), len(name), label_ids[label], score)
+        names += name
+    for rule in rules:
+        suffixes += SUFFIX_RULE.pack(len(names), len(rule))
+        names += rule
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(
+                MAGIC, VERSION, len(labels), len(items), entries_offset, names_offset, len(rules), suffixes_offset
+            ))
+            f.write(label_table)
+            f.write(entries)
+            f.write(suffixes)
+            f.write(names)
+        os.replace(temp_path, path)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+
+def build_index(source_paths: Iterable[str], output_path: str, public_suffix_path: str = DEFAULT_PUBLIC_SUFFIX_LIST) -> int:
+    """
+    Builds an index from one or more CSV/JSON files, embedding the suffix rules from
+    `public_suffix_path`. Returns the number of domains.
+    """
+    ratings = {}
+    for source_path in source_paths:
+        ratings.update(load_ratings(source_path))
+    write_index(ratings, output_path, load_public_suffix_list(public_suffix_path))
+    return len(ratings)
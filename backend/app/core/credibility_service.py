@@ -0,0 +1,110 @@
+# In backend/app/core/credibility_service.py
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+from ..config import get_settings
+from .credibility_index import CredibilityIndex
+
+settings = get_settings()
+
+
+class CredibilityService:
+    """
+    Scores article and source URLs against the local domain-reputation index.
+
+    The index is re-opened whenever its file changes on disk, so a rebuilt index is
+    picked up without a restart. The swap is a single reference assignment; lookups
+    that are already running finish against the old mapping, which is unmapped once
+    nothing references it. Callbacks registered with `add_reload_listener` run after
+    every reload, e.g. to drop cached results scored against the old index.
+    """
+
+    def __init__(self, path: str, reload_seconds: float):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._index: Optional[CredibilityIndex] = None
+        self._loaded_mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+        self._reload_listeners: List[Callable[[], None]] = []
+        self._maybe_reload(force=True)
+
+    def add_reload_listener(self, callback: Callable[[], None]):
+        """Registers a callback to run whenever a changed index file has been loaded."""
+        self._reload_listeners.append(callback)
+
+    def _maybe_reload(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return # Another thread is already checking
+        try:
+            self._next_check = now + self.reload_seconds
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                if self._index is not None:
+                    print(f"Credibility index '{self.path}' was removed; keeping the loaded copy.")
+                return
+            if mtime == self._loaded_mtime:
+                return
+
+            try:
+                self._index = CredibilityIndex(self.path)
+                self._loaded_mtime = mtime
+                print(f"Credibility index loaded: {len(self._index)} domains.")
+            except Exception as e:
+                print(f"Could not load credibility index '{self.path}': {e}")
+                return
+
+            for callback in self._reload_listeners:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Error in credibility index reload listener: {e}")
+        finally:
+            self._reload_lock.release()
+
+    @property
+    def available(self) -> bool:
+        return self._index is not None
+
+    def rate(self, url: Optional[str]) -> Optional[dict]:
+        """Rates a single URL or domain. Returns None if it is not in the index."""
+        self._maybe_reload()
+        index = self._index
+        if index is None or not url:
+            return None
+
+        rating = index.lookup(url)
+        if rating is None:
+            return None
+        return {"url": url, **rating._asdict()}
+
+    def score_request(self, source_url: Optional[str], cited_sources: Optional[List[str]]) -> dict:
+        """
+        Scores the article URL and every cited source URL against the index.
+        """
+        cited_sources = [source for source in (cited_sources or []) if isinstance(source, str)]
+        rated_sources = [rating for rating in (self.rate(source) for source in cited_sources) if rating]
+
+        return {
+            "index_available": self.available,
+            "article": self.rate(source_url),
+            "sources": rated_sources,
+            "sources_checked": len(cited_sources),
+            "average_source_score": (
+                round(sum(rating["score"] for rating in rated_sources) / len(rated_sources), 4)
+                if rated_sources else None
+            ),
+        }
+
+
+# Create a single, reusable instance of the service.
+credibility_service_instance = CredibilityService(
+    path=settings.CREDIBILITY_INDEX_PATH,
+    reload_seconds=settings.CREDIBILITY_INDEX_RELOAD_SECONDS,
+)
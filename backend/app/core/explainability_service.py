@@ -1,17 +1,85 @@
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+
+# Words scoring at least this fraction of the strongest word count as salient.
+SALIENCE_THRESHOLD = 0.5
 
 class ExplainabilityService:
     """
     A service to generate human-readable explanations for AI-driven credibility scores.
 
     For a hackathon, this uses a fast and effective rule-based approach instead of
-    computationally expensive methods like SHAP or LIME.
+    computationally expensive methods like SHAP or LIME. When the text analysis
+    provides token attributions, those are used to point at the phrases that
+    drove the result.
     """
 
+    def highlight_phrases(self, attributions: Optional[Dict], top_k: int = 5) -> List[Dict]:
+        """
+        Groups salient, adjacent words from the text analysis attributions into phrases.
+
+        Args:
+            attributions: The 'attributions' entry of the text analysis result.
+            top_k: The maximum number of phrases to return.
+
+        Returns:
+            Phrases ({text, start, end, score}) ordered from most to least influential.
+            Offsets refer to the analyzed text.
+        """
+        if not attributions or not attributions.get("tokens"):
+            return []
+
+        phrases = []
+        previous_index = None
+        for index, word in enumerate(attributions["tokens"]):
+            if word["score"] < SALIENCE_THRESHOLD:
+                continue
+            if phrases and previous_index == index - 1:
+                phrase = phrases[-1]
+                phrase["text"] += " " + word["text"]
+                phrase["end"] = word["end"]
+                phrase["score"] += word["score"]
+            else:
+                phrases.append({"text": word["text"], "start": word["start"], "end": word["end"], "score": word["score"]})
+            previous_index = index
+
+        for phrase in phrases:
+            phrase["score"] = round(phrase["score"], 4)
+        return sorted(phrases, key=lambda phrase: phrase["score"], reverse=True)[:top_k]
+
+    def describe_source_credibility(self, source_credibility: Optional[Dict]) -> str:
+        """
+        Summarizes the source credibility lookups for the article and its cited sources.
+
+        Args:
+            source_credibility: The output of CredibilityService.score_request.
+
+        Returns:
+            A human-readable sentence or two about the sources.
+        """
+        article = source_credibility.get("article") if source_credibility else None
+        sources = source_credibility.get("sources") if source_credibility else None
+        if not article and not sources:
+            return "Source credibility could not be verified at this time."
+
+        parts = []
+        if article:
+            parts.append(
+                f"The article's source, {article['matched_domain']}, is rated '{article['label']}' "
+                f"({article['score']:.2f} out of 1.0)."
+            )
+        if sources:
+            parts.append(
+                f"{len(sources)} of {source_credibility['sources_checked']} cited sources are in the credibility index, "
+                f"with an average rating of {source_credibility['average_source_score']:.2f}."
+            )
+        return " ".join(parts)
+
     def generate_explanation(
         self,
         text_analysis_result: Dict,
-        image_analysis_result: Optional[Dict]
+        image_analysis_result: Optional[Dict],
+        highlights: Optional[List[Dict]] = None,
+        source_credibility: Optional[Dict] = None
     ) -> str:
         """
         Constructs an explanation string from the analysis result dictionaries.
@@ -19,6 +87,8 @@ class ExplainabilityService:
         Args:
             text_analysis_result: The dictionary output from the text analysis module.
             image_analysis_result: The dictionary output from the image analysis module.
+            highlights: Optional phrases from `highlight_phrases` that drove the text result.
+            source_credibility: Optional output of CredibilityService.score_request.
 
         Returns:
             A consolidated, human-readable explanation string.
@@ -29,12 +99,17 @@ class ExplainabilityService:
         if 'flag' in text_analysis_result:
             explanations.append(text_analysis_result['flag'])
 
+        # Point at the phrases that most influenced the text analysis
+        if highlights:
+            quoted = ", ".join(f'"{phrase["text"]}"' for phrase in highlights)
+            explanations.append(f"The phrases that most influenced this assessment were: {quoted}.")
+
         # Add explanation from the image-text match analysis
         if image_analysis_result and 'flag' in image_analysis_result:
             explanations.append(image_analysis_result['flag'])
 
-        # Add explanation for source credibility (currently a placeholder)
-        explanations.append("Source credibility could not be verified at this time.")
+        # Add explanation for source credibility from the local reputation index
+        explanations.append(self.describe_source_credibility(source_credibility))
 
         if not explanations:
             return "No specific flags were raised during the analysis."
@@ -1,10 +1,11 @@
 # In backend/app/core/forensics_service.py
 from PIL import Image
-import io
 import json
+from typing import Optional
 
 # Import the Gemini model instance from the gemini_service
 from .gemini_service import model
+from .image_buffer import open_image, ImageData
 
 class ForensicsService:
     """
@@ -86,19 +87,23 @@ class ForensicsService:
             print(f"Error during Gemini Vision analysis: {e}")
             return {"error": f"Gemini Vision analysis failed: {e}"}
 
-    def analyze_image_authenticity(self, image_bytes: bytes, source_context: str) -> dict:
+    def analyze_image_authenticity(self, image_bytes: ImageData, source_context: str, vision_result: Optional[dict] = None) -> dict:
         """
         The main public method that orchestrates the full forensic analysis,
         now using the user-provided source context.
+        `image_bytes` may be raw bytes or a zero-copy memoryview of an upload.
+        If `vision_result` is given (e.g. from a combined Gemini call), the separate
+        Gemini Vision call is skipped and that verdict is used instead.
         """
         try:
-            image = Image.open(io.BytesIO(image_bytes))
+            image = open_image(image_bytes)
         except Exception as e:
             return {"error": f"Could not open image file: {e}"}
 
         # --- Run all forensic analyses ---
         metadata_result = self._analyze_metadata(image)
-        vision_result = self._analyze_with_gemini_vision(image)
+        if vision_result is None:
+            vision_result = self._analyze_with_gemini_vision(image)
 
         # --- CONTEXT-AWARE SYNTHESIS ---
         final_verdict = vision_result.get("verdict", "Error")
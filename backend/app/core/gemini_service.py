@@ -2,8 +2,7 @@
 import google.generativeai as genai
 import json
 from ..config import get_settings
-from PIL import Image
-import io
+from .image_buffer import open_image, ImageData
 
 # --- Gemini Model Configuration ---
 try:
@@ -15,6 +14,13 @@ except Exception as e:
     print(f"Error configuring Gemini model: {e}")
     model = None
 
+# Required fields of each section of the combined image response, and their types.
+# Forensics feeds ForensicsService and fact_check becomes the AnalysisResponse body.
+COMBINED_SECTION_FIELDS = {
+    "forensics": {"verdict": str, "confidence_score": (int, float), "reasoning": str},
+    "fact_check": {"verdict": str, "confidence_score": (int, float), "explanation": str, "enrichment": list, "sources": list},
+}
+
 class GeminiService:
     def _create_super_prompt(self, claim: str) -> str:
         """
@@ -37,6 +43,90 @@ class GeminiService:
         }}
         """
 
+    def _create_image_super_prompt(self) -> str:
+        """
+        A combined prompt for image-only requests: forensic analysis, claim extraction
+        and fact-checking of that claim, all from a single upload of the image.
+        """
+        return """
+        You are a world-class digital image forensics expert and Trust & Safety analysis engine. For the PROVIDED IMAGE, do three things:
+
+        1) FORENSICS: Analyze the image for signs of AI generation or digital manipulation. Base every claim on visible evidence: lighting & shadows, geometry & perspective, textures & materials, biological plausibility (hands, eyes, teeth), background & fine print (warped or gibberish text), color/tone & depth of field, edges/compositing halos, noise & compression, and editing tells (cloning, mismatched sharpness). If evidence is insufficient, choose "Indeterminate". Cap confidence at 0.85 unless evidence is overwhelming; use 0.40-0.60 for mixed signals and 0.20-0.35 with "Indeterminate" for low-res or obstructed images.
+        2) CLAIM: Describe the primary subject, scene, and any text visible, and formulate this description into a single, concise factual claim.
+        3) FACT-CHECK: Analyze that claim for factual accuracy, provide context, and cite credible sources.
+
+        Your response MUST be a single, minified JSON object with the following schema. Do not include markdown, code fences, or any text before or after the JSON object.
+
+        {
+          "forensics": {
+            "verdict": "One of: 'Likely AI-Generated', 'Likely Real Photograph', 'Indeterminate'.",
+            "confidence_score": "A float from 0.0 to 1.0 with up to 2 decimals.",
+            "reasoning": "A concise, stepwise explanation referencing the cues above. Max ~700 characters. No newlines."
+          },
+          "claim": "The single, concise factual claim describing the image.",
+          "fact_check": {
+            "verdict": "A short, definitive verdict. Choose one of: 'Factually Correct', 'Factually Incorrect', 'Misleading', 'Lacks Context'.",
+            "confidence_score": "A float from 0.0 to 1.0 representing your confidence in the verdict.",
+            "explanation": "A detailed but concise explanation of your reasoning. Explain WHY the claim is correct or incorrect. If it's misleading, explain what nuance is missing.",
+            "correction": "If the verdict is 'Factually Incorrect' or 'Misleading', provide the corrected information. Otherwise, this should be null.",
+            "enrichment": "An array of 2-3 strings. Each string is an additional, interesting, and verifiable fact that provides more context about the main subjects of the claim.",
+            "sources": "An array of 2-3 URL strings from highly credible, publicly available sources that a user can visit to verify the information."
+          }
+        }
+        """
+
+    @staticmethod
+    def _validate_combined(result) -> str:
+        """
+        Checks a combined image response against COMBINED_SECTION_FIELDS.
+        Returns a description of the first problem found, or an empty string.
+        """
+        if not isinstance(result, dict):
+            return "the response is not a JSON object"
+        for section, fields in COMBINED_SECTION_FIELDS.items():
+            value = result.get(section)
+            if not isinstance(value, dict):
+                return f"'{section}' is missing"
+            for field, expected_type in fields.items():
+                field_value = value.get(field)
+                # bool is a subclass of int, but never a valid score
+                if not isinstance(field_value, expected_type) or isinstance(field_value, bool):
+                    return f"'{section}.{field}' is missing or invalid"
+                if expected_type is str and not field_value.strip():
+                    return f"'{section}.{field}' is empty"
+                if expected_type is list and not all(isinstance(item, str) for item in field_value):
+                    return f"'{section}.{field}' must be a list of strings"
+        if result["fact_check"].get("correction") is not None and not isinstance(result["fact_check"]["correction"], str):
+            return "'fact_check.correction' is invalid"
+        # The claim feeds the text analysis, so an empty one must fall back like any other failure.
+        if not isinstance(result.get("claim"), str) or not result["claim"].strip():
+            return "'claim' is missing or empty"
+        return ""
+
+    def analyze_image_combined(self, image_bytes: ImageData) -> dict:
+        """
+        Runs forensics, claim extraction and fact-checking for an image in one Gemini call.
+        Returns a dict with 'forensics', 'claim' and 'fact_check' keys, or {'error': ...}.
+        """
+        if not model:
+            return {"error": "Gemini model is not configured."}
+
+        try:
+            image_for_gemini = open_image(image_bytes)
+            response = model.generate_content([self._create_image_super_prompt(), image_for_gemini])
+
+            cleaned_response = response.text.strip().replace("```json", "").replace("```", "").strip()
+            result = json.loads(cleaned_response)
+
+            problem = self._validate_combined(result)
+            if problem:
+                return {"error": f"Combined image analysis returned an incomplete response: {problem}."}
+            result["claim"] = result["claim"].strip()
+            return result
+        except Exception as e:
+            print(f"Error during combined Gemini image analysis: {e}")
+            return {"error": f"Combined image analysis failed: {e}"}
+
     def verify_claim(self, claim: str) -> dict:
         if not model:
             return {"error": "Gemini model is not configured."}
@@ -54,7 +144,7 @@ class GeminiService:
             print(f"Error during Gemini verification: {e}")
             return {"error": "An error occurred during fact-checking."}
 
-    def describe_image_for_claim(self, image_bytes: bytes) -> str:
+    def describe_image_for_claim(self, image_bytes: ImageData) -> str:
         """
         Uses Gemini's multimodal capabilities to describe an image and generate a claim.
         """
@@ -62,7 +152,7 @@ class GeminiService:
             return "Error: Gemini model is not configured."
 
         try:
-            image_for_gemini = Image.open(io.BytesIO(image_bytes))
+            image_for_gemini = open_image(image_bytes)
             # This is the multimodal prompt
             response = model.generate_content([
                 "Analyze this image closely. Describe the primary subject, scene, and any text visible. Formulate this description into a single, concise factual claim.",
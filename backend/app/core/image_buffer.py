@@ -0,0 +1,230 @@
+# In backend/app/core/image_buffer.py
+import io
+import mmap
+import tempfile
+from typing import Optional, Union
+
+import requests
+from PIL import Image
+
+from ..config import get_settings
+
+settings = get_settings()
+
+# Anything that exposes the buffer protocol: raw bytes, a memoryview over a memory map, etc.
+ImageData = Union[bytes, bytearray, memoryview]
+
+
+class UploadTooLargeError(Exception):
+    """Raised while streaming an image once it exceeds the configured byte limit."""
+
+
+class ImageTooLargeError(Exception):
+    """Raised when an image header declares more pixels than we are willing to decode."""
+
+
+class ImageBuffer:
+    """
+    Holds a streamed image in memory or on disk, depending on its size.
+
+    Small images stay in an in-memory buffer. Once the spool threshold is crossed the
+    data is moved to an anonymous temp file, which is later read back through a memory
+    map. Either way, `view()` returns a zero-copy memoryview that downstream stages
+    can share without duplicating the image bytes.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, spool_max_bytes: Optional[int] = None):
+        self._max_bytes = max_bytes if max_bytes is not None else settings.MAX_UPLOAD_BYTES
+        self._spool_max_bytes = spool_max_bytes if spool_max_bytes is not None else settings.UPLOAD_SPOOL_MAX_BYTES
+        self._file = io.BytesIO()
+        self._on_disk = False
+        self._size = 0
+        self._mmap = None
+        self._view = None
+        self._owns_file = True
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def write(self, chunk: bytes) -> None:
+        """Appends a chunk, enforcing the size limit before the chunk is buffered."""
+        if self._view is not None:
+            raise ValueError("Cannot write to an ImageBuffer after its view has been taken.")
+
+        self._size += len(chunk)
+        if self._size > self._max_bytes:
+            raise UploadTooLargeError(
+                f"Image exceeds the maximum allowed size of {self._max_bytes // (1024 * 1024)} MB."
+            )
+
+        if not self._on_disk and self._size > self._spool_max_bytes:
+            self._roll_to_disk()
+        self._file.write(chunk)
+
+    @classmethod
+    def from_file(cls, fileobj, max_bytes: Optional[int] = None) -> "ImageBuffer":
+        """
+        Wraps a file that already holds the whole image, such as the spooled temp file
+        behind a FastAPI UploadFile. Images over the spool threshold are memory-mapped
+        straight from the file's descriptor; smaller ones are copied into a buffer of our
+        own, so no buffer of the caller's file is ever exported. The file is not closed
+        by `close()`; its owner remains responsible for it.
+        """
+        buffer = cls(max_bytes=max_bytes)
+
+        size = fileobj.seek(0, io.SEEK_END)
+        fileobj.seek(0)
+        if size > buffer._max_bytes:
+            buffer.close()
+            raise UploadTooLargeError(
+                f"Image exceeds the maximum allowed size of {buffer._max_bytes // (1024 * 1024)} MB."
+            )
+
+        if size <= buffer._spool_max_bytes:
+            for chunk in iter(lambda: fileobj.read(settings.UPLOAD_CHUNK_SIZE), b""):
+                buffer.write(chunk)
+            return buffer
+
+        # Uploads this large have already been rolled over to disk by the spooled file
+        # (Starlette spools at 1 MB), so view() maps its real fileno() without copying.
+        buffer._file.close()
+        buffer._file = fileobj
+        buffer._owns_file = False
+        buffer._on_disk = True
+        buffer._size = size
+        return buffer
+
+    def _roll_to_disk(self) -> None:
+        disk_file = tempfile.TemporaryFile()
+        disk_file.write(self._file.getbuffer())
+        self._file.close()
+        self._file = disk_file
+        self._on_disk = True
+
+    def view(self) -> memoryview:
+        """
+        Returns a zero-copy view of the buffered image. No more writes are allowed afterwards.
+        On-disk buffers are memory-mapped; in-memory buffers expose their backing store.
+        """
+        if self._view is None:
+            if self._size == 0:
+                self._view = memoryview(b"") # mmap cannot map an empty file
+            elif self._on_disk:
+                self._file.flush()
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mmap)
+            else:
+                self._view = self._file.getbuffer()
+        return self._view
+
+    def close(self) -> None:
+        try:
+            if self._view is not None:
+                self._view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+            if self._owns_file:
+                self._file.close()
+        except BufferError:
+            # A stage still holds a slice of the view. The buffer is ours, so nothing
+            # else is affected; it is freed once the last slice is garbage collected.
+            print("ImageBuffer closed while a view slice is still referenced; it will be freed later.")
+        self._view = None
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class BufferReader(io.RawIOBase):
+    """
+    A seekable, read-only file object over a bytes-like buffer.
+    Unlike io.BytesIO, it does not copy the buffer it is given, so PIL can read
+    straight out of a memory map.
+    """
+
+    def __init__(self, data: ImageData):
+        super().__init__()
+        self._view = data if isinstance(data, memoryview) else memoryview(data)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if self._pos < 0:
+            raise ValueError("Negative seek position.")
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def buffer_upload(upload_file) -> ImageBuffer:
+    """
+    Wraps a FastAPI UploadFile in an ImageBuffer without copying it.
+    The request body limit (see RequestBodyLimitMiddleware) has already bounded how much
+    was received; this additionally enforces MAX_UPLOAD_BYTES on the image part itself.
+    """
+    return ImageBuffer.from_file(upload_file.file)
+
+
+def spool_url(url: str, timeout: int = 10) -> ImageBuffer:
+    """
+    Downloads an image URL into an ImageBuffer with the same size limit as uploads.
+    """
+    buffer = ImageBuffer()
+    try:
+        with requests.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status() # Raise an exception for bad status codes
+            content_length = response.headers.get("Content-Length")
+            if content_length and content_length.isdigit() and int(content_length) > settings.MAX_UPLOAD_BYTES:
+                raise UploadTooLargeError(
+                    f"Image exceeds the maximum allowed size of {settings.MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+                )
+            for chunk in response.iter_content(chunk_size=settings.UPLOAD_CHUNK_SIZE):
+                buffer.write(chunk)
+    except Exception:
+        buffer.close()
+        raise
+    return buffer
+
+
+def open_image(data: ImageData) -> Image.Image:
+    """
+    Opens an image without copying its bytes and checks its dimensions from the header.
+    PIL only parses the header in Image.open, so oversized images (decompression bombs)
+    are rejected here before any pixel data is decoded.
+    """
+    try:
+        image = Image.open(BufferReader(data))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from e
+
+    width, height = image.size
+    if width * height > settings.MAX_IMAGE_PIXELS:
+        raise ImageTooLargeError(
+            f"Image dimensions {width}x{height} exceed the maximum of {settings.MAX_IMAGE_PIXELS} pixels."
+        )
+    return image
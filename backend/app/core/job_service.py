@@ -0,0 +1,323 @@
+# In backend/app/core/job_service.py
+import asyncio
+import json
+import os
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import or_
+
+from ..config import get_settings
+from ..database import SessionLocal
+from ..models.analysis_job import AnalysisJob, JobStatus
+from .admission_control import admission_controller_instance, AdmissionController
+from .analysis_service import analysis_service_instance
+
+settings = get_settings()
+
+# How often finished jobs past their TTL are deleted, and lapsed leases re-queued.
+PURGE_INTERVAL_SECONDS = 60
+
+# A running job's lease is renewed this many times per JOB_LEASE_SECONDS.
+LEASE_RENEWALS_PER_PERIOD = 3
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while JOB_MAX_QUEUED jobs are already waiting."""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobService:
+    """
+    A persistent, low-priority queue for analysis requests.
+
+    Jobs are stored in the database, so queued work survives a restart. A pool of
+    worker tasks claims queued jobs and runs them through AnalysisService on a
+    dedicated thread pool, which keeps the event loop free for interactive traffic.
+    Each job runs on a low-priority slot of the /analyze admission controller, so
+    jobs share its concurrency limit and interactive requests are always served first.
+
+    Several processes may share the database (replicas, rolling restarts). A worker
+    claims a job under its process's owner ID with a lease, which it renews for as
+    long as the job runs; only jobs whose lease has lapsed are ever re-queued.
+    """
+
+    def __init__(self, admission: AdmissionController):
+        self._admission = admission
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._maintenance_executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: list = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup = asyncio.Event()
+
+    # --- Public API ---
+
+    def submit(self, params: dict, image_data: Optional[bytes] = None) -> str:
+        """
+        Persists a new job and wakes up an idle worker. Returns the job ID.
+        This makes blocking database calls, so call it from a worker thread.
+        Raises JobQueueFullError if JOB_MAX_QUEUED jobs are already waiting.
+        """
+        job_id = str(uuid.uuid4())
+        db = SessionLocal()
+        try:
+            queued = db.query(AnalysisJob).filter(AnalysisJob.status == JobStatus.QUEUED).count()
+            if queued >= settings.JOB_MAX_QUEUED:
+                raise JobQueueFullError(f"The analysis job queue is full ({queued} jobs waiting). Please retry later.")
+
+            db.add(AnalysisJob(
+                id=job_id,
+                status=JobStatus.QUEUED,
+                params=json.dumps(params),
+                image_data=image_data,
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+        # Called from a worker thread, so hand the wake-up back to the event loop.
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Returns the status and, once finished, the result of a job.
+        Returns None for unknown or expired jobs.
+        This makes blocking database calls, so call it from a worker thread.
+        """
+        db = SessionLocal()
+        try:
+            job = (
+                db.query(AnalysisJob)
+                .filter(AnalysisJob.id == job_id)
+                .filter(or_(AnalysisJob.expires_at.is_(None), AnalysisJob.expires_at > _utcnow()))
+                .first()
+            )
+            if job is None:
+                return None
+            return {
+                "job_id": job.id,
+                "status": job.status.value,
+                "result": json.loads(job.result) if job.result else None,
+                "error": job.error,
+                "created_at": job.created_at,
+                "finished_at": job.finished_at,
+            }
+        finally:
+            db.close()
+
+    # --- Worker Lifecycle ---
+
+    def start(self):
+        """
+        Starts the worker pool. Must be called from within the running event loop.
+        """
+        if self._tasks or settings.JOB_WORKER_CONCURRENCY <= 0:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._requeue_expired_leases()
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.JOB_WORKER_CONCURRENCY,
+            thread_name_prefix="analysis-job",
+        )
+        # Purging gets its own thread, so long-running jobs never hold it up.
+        self._maintenance_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis-job-purge")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(settings.JOB_WORKER_CONCURRENCY)]
+        self._tasks.append(asyncio.create_task(self._purge_periodically()))
+        print(f"Job queue started with {settings.JOB_WORKER_CONCURRENCY} workers.")
+
+    async def stop(self):
+        """
+        Stops the worker pool. Jobs that were running are re-queued once their lease lapses.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._maintenance_executor:
+            self._maintenance_executor.shutdown(wait=False, cancel_futures=True)
+            self._maintenance_executor = None
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # Clear before looking, so a job submitted meanwhile still wakes us up.
+                self._wakeup.clear()
+                job = await loop.run_in_executor(self._executor, self._claim_next_job)
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=settings.JOB_POLL_INTERVAL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                # Renew the lease from the moment of the claim, including the wait for a slot.
+                # If the worker is stopped, renewals stop and the job is re-queued once it lapses.
+                heartbeat = asyncio.create_task(self._renew_lease_periodically(job[0]))
+                try:
+                    async with self._admission.admit_background():
+                        await loop.run_in_executor(self._executor, self._run_job, *job)
+                finally:
+                    heartbeat.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in analysis job worker: {e}")
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+
+    async def _renew_lease_periodically(self, job_id: str):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / LEASE_RENEWALS_PER_PERIOD)
+            try:
+                await loop.run_in_executor(self._maintenance_executor, self._renew_lease, job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error renewing the lease of analysis job {job_id}: {e}")
+
+    async def _purge_periodically(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(self._maintenance_executor, self._requeue_expired_leases)
+                await loop.run_in_executor(self._maintenance_executor, self._purge_expired_jobs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error purging expired analysis jobs: {e}")
+            await asyncio.sleep(PURGE_INTERVAL_SECONDS)
+
+    # --- Database Operations (run on the worker thread pool) ---
+
+    def _claim_next_job(self) -> Optional[tuple]:
+        """
+        Claims the oldest queued job and returns its (job_id, params, image_data),
+        or None if the queue was empty.
+        """
+        db = SessionLocal()
+        try:
+            while True:
+                job = (
+                    db.query(AnalysisJob)
+                    .filter(AnalysisJob.status == JobStatus.QUEUED)
+                    .order_by(AnalysisJob.created_at)
+                    .first()
+                )
+                if job is None:
+                    return None
+
+                job_id, params, image_data = job.id, json.loads(job.params), job.image_data
+
+                # Claim the job with a conditional update, so two workers never run the same job.
+                claimed = (
+                    db.query(AnalysisJob)
+                    .filter(AnalysisJob.id == job_id, AnalysisJob.status == JobStatus.QUEUED)
+                    .update({
+                        AnalysisJob.status: JobStatus.RUNNING,
+                        AnalysisJob.claimed_by: self._owner,
+                        AnalysisJob.lease_expires_at: _utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                    }, synchronize_session=False)
+                )
+                db.commit()
+                if claimed:
+                    return job_id, params, image_data
+                # Another worker got there first; try the next job.
+        finally:
+            db.close()
+
+    def _run_job(self, job_id: str, params: dict, image_data: Optional[bytes]):
+        try:
+            # Already on a job worker thread, so call the synchronous analysis directly.
+            result = analysis_service_instance.run_analysis(image_bytes=image_data, **params)
+            self._finish_job(job_id, JobStatus.COMPLETED, result=json.dumps(result, default=str))
+        except Exception as e:
+            print(f"Analysis job {job_id} failed: {e}")
+            self._finish_job(job_id, JobStatus.FAILED, error=str(e))
+
+    def _owned_job(self, db, job_id: str):
+        # Matches the job only while this process still holds its claim.
+        return db.query(AnalysisJob).filter(
+            AnalysisJob.id == job_id,
+            AnalysisJob.status == JobStatus.RUNNING,
+            AnalysisJob.claimed_by == self._owner,
+        )
+
+    def _finish_job(self, job_id: str, status: JobStatus, result: Optional[str] = None, error: Optional[str] = None):
+        now = _utcnow()
+        db = SessionLocal()
+        try:
+            finished = self._owned_job(db, job_id).update({
+                AnalysisJob.status: status,
+                AnalysisJob.result: result,
+                AnalysisJob.error: error,
+                AnalysisJob.image_data: None,
+                AnalysisJob.finished_at: now,
+                AnalysisJob.expires_at: now + timedelta(seconds=settings.JOB_RESULT_TTL_SECONDS),
+                AnalysisJob.lease_expires_at: None,
+            }, synchronize_session=False)
+            db.commit()
+            if not finished:
+                print(f"Analysis job {job_id} lost its lease before finishing; its result was discarded.")
+        finally:
+            db.close()
+
+    def _renew_lease(self, job_id: str):
+        db = SessionLocal()
+        try:
+            self._owned_job(db, job_id).update(
+                {AnalysisJob.lease_expires_at: _utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS)},
+                synchronize_session=False,
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _requeue_expired_leases(self):
+        """
+        Running jobs whose lease has lapsed belong to a process that died or stopped,
+        so queue them again. Jobs another live process is running keep renewing their
+        lease and are left alone.
+        """
+        db = SessionLocal()
+        try:
+            requeued = (
+                db.query(AnalysisJob)
+                .filter(AnalysisJob.status == JobStatus.RUNNING)
+                .filter(or_(AnalysisJob.lease_expires_at.is_(None), AnalysisJob.lease_expires_at <= _utcnow()))
+                .update({
+                    AnalysisJob.status: JobStatus.QUEUED,
+                    AnalysisJob.claimed_by: None,
+                    AnalysisJob.lease_expires_at: None,
+                }, synchronize_session=False)
+            )
+            db.commit()
+            if requeued:
+                print(f"Re-queued {requeued} analysis jobs whose lease expired.")
+        finally:
+            db.close()
+
+    def _purge_expired_jobs(self):
+        db = SessionLocal()
+        try:
+            db.query(AnalysisJob).filter(AnalysisJob.expires_at <= _utcnow()).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+# Create a single, reusable instance of the service.
+job_service_instance = JobService(admission=admission_controller_instance)
@@ -0,0 +1,154 @@
+# In backend/app/core/result_cache.py
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from ..config import get_settings
+from .image_buffer import ImageData
+
+settings = get_settings()
+
+
+class CachedResult(NamedTuple):
+    etag: str
+    payload: dict
+
+
+class ResultCache:
+    """
+    An in-memory LRU cache of /analyze results with a per-entry TTL.
+
+    Entries are keyed by the request content (see `make_key`), and each stored
+    result carries an ETag derived from the result itself, so a client holding
+    that ETag can revalidate with If-None-Match and get a 304 instead of the body.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, enabled: bool = True):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def normalize_text(text: Optional[str]) -> str:
+        """Unicode-normalizes the text and collapses all runs of whitespace."""
+        if not text:
+            return ""
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    @classmethod
+    def make_key(
+        cls,
+        text: Optional[str],
+        image_data: Optional[ImageData],
+        image_url: Optional[str],
+        image_source_context: Optional[str],
+        **options,
+    ) -> str:
+        """
+        Hashes everything that can change the analysis result into a cache key.
+        Uploaded images are hashed by content; image URLs by the URL itself.
+        """
+        hasher = hashlib.sha256()
+
+        def add(name: str, value: bytes):
+            # Length-prefix every field so different splits of the same bytes never collide.
+            hasher.update(f"{name}:{len(value)}:".encode())
+            hasher.update(value)
+
+        add("text", cls.normalize_text(text).encode("utf-8"))
+        add("image", hashlib.sha256(image_data).digest() if image_data is not None else b"")
+        add("image_url", (image_url or "").strip().encode("utf-8"))
+        add("source_context", (image_source_context or "").encode("utf-8"))
+        for name in sorted(options):
+            add(f"option.{name}", json.dumps(options[name]).encode("utf-8"))
+        return hasher.hexdigest()
+
+    @staticmethod
+    def make_etag(payload: dict) -> str:
+        body = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    @staticmethod
+    def is_cacheable(payload: dict) -> bool:
+        """
+        Results produced after an upstream failure are not cached, so a transient
+        Gemini or download error isn't served back for a whole TTL. AnalysisService
+        marks those results as `degraded`.
+        """
+        return not payload.get("degraded", False)
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            expires_at, cached = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return cached
+
+    def put(self, key: str, payload: dict) -> str:
+        """Stores a result and returns its ETag."""
+        cached = CachedResult(etag=self.make_etag(payload), payload=payload)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, cached)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return cached.etag
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Checks an If-None-Match header against an ETag, using weak comparison as
+    RFC 9110 requires for If-None-Match.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+# Create a single, reusable instance of the cache.
+result_cache_instance = ResultCache(
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+    enabled=settings.RESULT_CACHE_ENABLED,
+)
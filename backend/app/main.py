@@ -5,13 +5,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from .config import get_settings
 from .database import engine
 from .models import vote # Import the vote model to ensure its table is created
+from .models import analysis_job # Same for the analysis job queue table
 
 # Import the API routers from the 'api' directory
-from .api import analysis_routes, feedback_routes
+from .api import analysis_routes, feedback_routes, metrics_routes
+from .api.request_limits import RequestBodyLimitMiddleware
+from .core.job_service import job_service_instance
+from .core.credibility_service import credibility_service_instance
+from .core.result_cache import result_cache_instance
 
 # --- Database Table Creation ---
 # This line is crucial. It tells SQLAlchemy to create the database tables
-# defined in your models (e.g., the 'votes' table) if they don't already exist.
+# defined in your models (e.g., the 'votes' and 'analysis_jobs' tables) if they don't already exist.
 # This is executed once when the application starts up.
 vote.Base.metadata.create_all(bind=engine)
 
@@ -34,13 +39,37 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"], # Allow all methods (GET, POST, etc.)
         allow_headers=["*"], # Allow all headers
+        expose_headers=["ETag", "X-Cache"], # Let the extension read cache validators
     )
 
+# --- Request Body Limit ---
+# Rejects oversized uploads before FastAPI parses (and spools) the multipart body.
+app.add_middleware(RequestBodyLimitMiddleware, max_body_bytes=settings.MAX_REQUEST_BODY_BYTES)
+
 # --- Include API Routers ---
 # This adds the endpoints defined in your route files to the main application.
 # The prefix makes all routes in that file start with, e.g., /api/v1/analyze
 app.include_router(analysis_routes.router, prefix=settings.API_V1_STR, tags=["Analysis"])
 app.include_router(feedback_routes.router, prefix=settings.API_V1_STR, tags=["Feedback"])
+app.include_router(metrics_routes.router, prefix=settings.API_V1_STR, tags=["Metrics"])
+
+
+# --- Cache Invalidation ---
+# Cached /analyze results embed source credibility ratings, so drop them whenever a
+# rebuilt credibility index is loaded. (A result still being computed across the
+# reload may be cached with the old ratings; it expires with the cache TTL.)
+credibility_service_instance.add_reload_listener(result_cache_instance.clear)
+
+
+# --- Background Workers ---
+# The analysis job queue runs in-process and is started/stopped with the app.
+@app.on_event("startup")
+async def start_job_workers():
+    job_service_instance.start()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_service_instance.stop()
 
 
 # --- Root Endpoint ---
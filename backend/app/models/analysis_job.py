@@ -0,0 +1,56 @@
+import enum
+from sqlalchemy import Column, String, Enum, DateTime, Text, LargeBinary
+from sqlalchemy.sql import func
+
+# Import the Base class from our database.py file
+from ..database import Base
+
+class JobStatus(str, enum.Enum):
+    """
+    The lifecycle of an asynchronous analysis job.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class AnalysisJob(Base):
+    """
+    SQLAlchemy ORM model for an analysis request submitted to the job queue.
+    Inputs are persisted alongside the result so queued jobs survive a restart.
+    """
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String(36), primary_key=True, index=True)
+
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.QUEUED, index=True)
+
+    # JSON-encoded request parameters (text, image_url, image_source_context, ...)
+    params = Column(Text, nullable=False)
+
+    # The uploaded image, if any. Cleared once the job has finished.
+    image_data = Column(LargeBinary, nullable=True)
+
+    # JSON-encoded analysis result, set when the job completes.
+    result = Column(Text, nullable=True)
+
+    error = Column(Text, nullable=True)
+
+    # The worker process that claimed the job, and when its claim lapses unless renewed.
+    # Jobs whose lease has expired are re-queued, e.g. after their process crashed.
+    claimed_by = Column(String(255), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Finished jobs are deleted once this time has passed.
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    def __repr__(self):
+        return f"<AnalysisJob(id={self.id}, status='{self.status.value}')>"
@@ -0,0 +1,115 @@
+import json
+from unittest.mock import patch, MagicMock
+
+from app.core.analysis_service import analysis_service_instance
+from app.core.gemini_service import gemini_service_instance
+
+COMBINED_RESULT = {
+    "forensics": {"verdict": "Likely Authentic", "confidence_score": 0.8, "reasoning": "Mocked reasoning."},
+    "claim": "A flooded street in the city centre.",
+    "fact_check": {
+        "verdict": "Misleading",
+        "confidence_score": 0.7,
+        "explanation": "Mocked explanation.",
+        "correction": None,
+        "enrichment": [],
+        "sources": [],
+    },
+}
+
+TEXT_RESULT = {"score": 0.7, "flag": "The text's tone appears to be neutral."}
+
+
+@patch("app.core.analysis_service.forensics_service_instance")
+@patch("app.core.analysis_service.gemini_service_instance")
+@patch.object(analysis_service_instance, "_analyze_text", return_value=dict(TEXT_RESULT))
+def test_image_only_uses_combined_call(mock_analyze_text, mock_gemini, mock_forensics):
+    """
+    Test that an image-only request makes one combined Gemini call and reuses its
+    forensics, claim and fact check instead of making separate calls.
+    """
+    mock_gemini.analyze_image_combined.return_value = COMBINED_RESULT
+    mock_forensics.analyze_image_authenticity.return_value = {"verdict": "Likely Authentic", "confidence": 0.8}
+
+    result = analysis_service_instance.run_analysis(image_bytes=b"image")
+
+    assert result["verdict"] == "Misleading"
+    assert result["degraded"] is False
+    assert mock_forensics.analyze_image_authenticity.call_args.kwargs["vision_result"] == COMBINED_RESULT["forensics"]
+    mock_analyze_text.assert_called_once_with(COMBINED_RESULT["claim"], include_attributions=False)
+    mock_gemini.describe_image_for_claim.assert_not_called()
+    mock_gemini.verify_claim.assert_not_called()
+
+
+@patch("app.core.analysis_service.forensics_service_instance")
+@patch("app.core.analysis_service.gemini_service_instance")
+@patch.object(analysis_service_instance, "_analyze_text", return_value=dict(TEXT_RESULT))
+def test_image_only_falls_back_when_combined_call_fails(mock_analyze_text, mock_gemini, mock_forensics):
+    """
+    Test that a failed combined call falls back to the separate Gemini calls.
+    """
+    mock_gemini.analyze_image_combined.return_value = {"error": "Combined image analysis returned no claim."}
+    mock_gemini.describe_image_for_claim.return_value = "A flooded street."
+    mock_gemini.verify_claim.return_value = COMBINED_RESULT["fact_check"]
+    mock_forensics.analyze_image_authenticity.return_value = {"verdict": "Likely Authentic", "confidence": 0.8}
+
+    result = analysis_service_instance.run_analysis(image_bytes=b"image")
+
+    assert result["verdict"] == "Misleading"
+    assert mock_forensics.analyze_image_authenticity.call_args.kwargs["vision_result"] is None
+    mock_gemini.describe_image_for_claim.assert_called_once()
+    mock_gemini.verify_claim.assert_called_once_with("A flooded street.")
+
+
+@patch("app.core.gemini_service.open_image")
+@patch("app.core.gemini_service.model")
+def test_combined_call_rejects_empty_claim(mock_model, mock_open_image):
+    """
+    Test that a combined response with a missing or blank claim is reported as an error.
+    """
+    for claim in ("", "   ", None):
+        mock_model.generate_content.return_value = MagicMock(text=json.dumps({**COMBINED_RESULT, "claim": claim}))
+        assert "error" in gemini_service_instance.analyze_image_combined(b"image")
+
+    mock_model.generate_content.return_value = MagicMock(text="```json\n" + json.dumps(COMBINED_RESULT) + "\n```")
+    assert gemini_service_instance.analyze_image_combined(b"image")["claim"] == COMBINED_RESULT["claim"]
+
+
+@patch("app.core.gemini_service.open_image")
+@patch("app.core.gemini_service.model")
+def test_combined_call_rejects_incomplete_sections(mock_model, mock_open_image):
+    """
+    Test that forensics or fact_check sections missing required fields, or with the
+    wrong types, are reported as errors so the separate calls run instead.
+    """
+    forensics, fact_check = COMBINED_RESULT["forensics"], COMBINED_RESULT["fact_check"]
+    broken_responses = [
+        {**COMBINED_RESULT, "forensics": {k: v for k, v in forensics.items() if k != "verdict"}},
+        {**COMBINED_RESULT, "forensics": {**forensics, "confidence_score": "high"}},
+        {**COMBINED_RESULT, "forensics": "Looks real."},
+        {**COMBINED_RESULT, "fact_check": {k: v for k, v in fact_check.items() if k != "explanation"}},
+        {**COMBINED_RESULT, "fact_check": {k: v for k, v in fact_check.items() if k != "sources"}},
+        {**COMBINED_RESULT, "fact_check": {**fact_check, "enrichment": "One fact."}},
+        {**COMBINED_RESULT, "fact_check": {**fact_check, "sources": [{"url": "https://example.com"}]}},
+        {**COMBINED_RESULT, "fact_check": {**fact_check, "verdict": ""}},
+        {**COMBINED_RESULT, "fact_check": {**fact_check, "correction": ["Not a string."]}},
+        [COMBINED_RESULT],
+    ]
+    for broken in broken_responses:
+        mock_model.generate_content.return_value = MagicMock(text=json.dumps(broken))
+        assert "error" in gemini_service_instance.analyze_image_combined(b"image"), broken
+
+
+@patch("app.core.analysis_service.forensics_service_instance")
+@patch("app.core.analysis_service.gemini_service_instance")
+@patch.object(analysis_service_instance, "_analyze_text", return_value=dict(TEXT_RESULT))
+def test_forensics_error_verdict_marks_result_degraded(mock_analyze_text, mock_gemini, mock_forensics):
+    """
+    Test that a forensics result with the 'Error' verdict counts as a failed stage.
+    """
+    mock_gemini.analyze_image_combined.return_value = COMBINED_RESULT
+    mock_forensics.analyze_image_authenticity.return_value = {"verdict": "Error", "confidence": 0.0}
+
+    result = analysis_service_instance.run_analysis(image_bytes=b"image")
+
+    assert result["degraded"] is True
@@ -1,8 +1,12 @@
+import asyncio
 from fastapi.testclient import TestClient
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock
 
 # Import the main FastAPI app instance from your main.py
 from app.main import app
+from app.core.result_cache import ResultCache
+from app.core.admission_control import AdmissionController, AdmissionRejected
+from app.core.job_service import JobQueueFullError
 
 # The TestClient allows you to make requests to your FastAPI application in your tests
 client = TestClient(app)
@@ -55,6 +59,385 @@ def test_analyze_content_missing_data():
     assert response.status_code == 422 # 422 Unprocessable Entity is FastAPI's validation error
     assert "field required" in response.text
 
+@patch("app.core.image_buffer.settings.MAX_UPLOAD_BYTES", 1024)
+def test_analyze_content_rejects_oversized_upload():
+    """
+    Test that an upload larger than MAX_UPLOAD_BYTES is rejected with 413
+    before it reaches the analysis service.
+    """
+    response = client.post(
+        "/api/v1/analyze",
+        files={"image_file": ("big.jpg", b"\xff" * 4096, "image/jpeg")}
+    )
+
+    assert response.status_code == 413
+    assert "maximum allowed size" in response.json()["detail"]
+
+@patch("app.api.analysis_routes.result_cache_instance", ResultCache(max_entries=8, ttl_seconds=60))
+@patch("app.api.analysis_routes.analysis_service_instance")
+def test_analyze_content_cached_with_etag(mock_analysis_service):
+    """
+    Test that a repeat request is served from the cache, and that sending back
+    the ETag in If-None-Match returns 304 without running the analysis again.
+    """
+    mock_result = {
+        "verdict": "Factually Correct",
+        "confidence_score": 0.9,
+        "explanation": "Mocked explanation.",
+        "correction": None,
+        "enrichment": [],
+        "sources": ["https://example.com"],
+    }
+    mock_analysis_service.analyze_content = AsyncMock(return_value=mock_result)
+
+    first = client.post("/api/v1/analyze", data={"text": "This is a test article."})
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "MISS"
+    etag = first.headers["ETag"]
+
+    # Whitespace differences normalize to the same cache key.
+    second = client.post("/api/v1/analyze", data={"text": "This is a  test article. "})
+    assert second.status_code == 200
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+
+    revalidated = client.post(
+        "/api/v1/analyze",
+        data={"text": "This is a test article."},
+        headers={"If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+    mock_analysis_service.analyze_content.assert_called_once()
+
+@patch("app.api.analysis_routes.result_cache_instance", ResultCache(max_entries=8, ttl_seconds=60))
+@patch("app.api.analysis_routes.analysis_service_instance")
+def test_analyze_content_caches_by_source_host(mock_analysis_service):
+    """
+    Test that the source URL is reduced to its host, so the same text shared from
+    different pages of one site hits the same cache entry.
+    """
+    mock_analysis_service.analyze_content = AsyncMock(return_value={
+        "verdict": "Factually Correct",
+        "confidence_score": 0.9,
+        "explanation": "Mocked explanation.",
+        "enrichment": [],
+        "sources": [],
+    })
+
+    first = client.post("/api/v1/analyze", data={"text": "Same text.", "source_url": "https://www.example.com/a?utm=1"})
+    second = client.post("/api/v1/analyze", data={"text": "Same text.", "source_url": "https://example.com/b"})
+
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.headers["ETag"] == first.headers["ETag"]
+    mock_analysis_service.analyze_content.assert_called_once()
+    assert mock_analysis_service.analyze_content.call_args.kwargs["source_url"] == "example.com"
+
+@patch("app.api.analysis_routes.result_cache_instance", ResultCache(max_entries=8, ttl_seconds=60))
+@patch("app.api.analysis_routes.analysis_service_instance")
+def test_analyze_content_degraded_not_cached(mock_analysis_service):
+    """
+    Test that a result produced after a stage fell back is not cached.
+    """
+    mock_analysis_service.analyze_content = AsyncMock(return_value={
+        "verdict": "Image Analyzed",
+        "confidence_score": 0.8,
+        "explanation": "Mocked explanation.",
+        "enrichment": [],
+        "sources": ["https://example.com"],
+        "image_authenticity": {"verdict": "Error", "visual_analysis": {"error": "Gemini Vision analysis failed"}},
+        "degraded": True,
+    })
+
+    first = client.post("/api/v1/analyze", data={"text": "This is a degraded test."})
+    second = client.post("/api/v1/analyze", data={"text": "This is a degraded test."})
+
+    assert first.status_code == 200
+    assert first.json()["degraded"] is True
+    assert "ETag" not in first.headers
+    assert second.headers["X-Cache"] == "MISS"
+    assert mock_analysis_service.analyze_content.call_count == 2
+
+@patch("app.api.analysis_routes.result_cache_instance", ResultCache(max_entries=8, ttl_seconds=60))
+@patch("app.api.analysis_routes.analysis_service_instance")
+def test_analyze_content_explain_flag(mock_analysis_service):
+    """
+    Test that explain=true is passed through so the text analysis returns attributions.
+    """
+    mock_analysis_service.analyze_content = AsyncMock(return_value={
+        "verdict": "Misleading",
+        "confidence_score": 0.7,
+        "explanation": "Mocked explanation.",
+        "enrichment": [],
+        "sources": [],
+        "linguistic_analysis": {"score": 0.3, "flag": "Mocked flag.", "highlights": [{"text": "shocking", "start": 0, "end": 8, "score": 1.0}]},
+    })
+
+    response = client.post("/api/v1/analyze", data={"text": "Shocking news!", "explain": "true"})
+
+    assert response.status_code == 200
+    assert response.json()["linguistic_analysis"]["highlights"][0]["text"] == "shocking"
+    assert mock_analysis_service.analyze_content.call_args.kwargs["explain"] is True
+
+@patch("app.api.analysis_routes.analysis_service_instance")
+def test_analyze_content_shed_when_saturated(mock_analysis_service):
+    """
+    Test that /analyze returns 503 with Retry-After once every slot is taken
+    and there is no room to queue.
+    """
+    saturated = AdmissionController(
+        initial_concurrency=1, min_concurrency=1, max_concurrency=1,
+        queue_size=0, queue_per_client=0, queue_timeout_seconds=0.1,
+        target_latency_ms=1000
+    )
+    asyncio.run(saturated.acquire("bulk-importer")) # Hold the only slot
+
+    with patch("app.api.analysis_routes.admission_controller_instance", saturated), \
+         patch("app.api.analysis_routes.result_cache_instance", ResultCache(max_entries=8, ttl_seconds=60)):
+        response = client.post("/api/v1/analyze", data={"text": "This is a test article."})
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    mock_analysis_service.analyze_content.assert_not_called()
+    assert saturated.stats()["shed_total"]["queue_full"] == 1
+
+def test_rotating_client_keys_cannot_fill_the_queue():
+    """
+    Test that a source sending a fresh X-Client-Key with every request is capped at its
+    per-source share of the queue, while other sources can still queue.
+    """
+    async def scenario():
+        controller = AdmissionController(
+            initial_concurrency=1, min_concurrency=1, max_concurrency=1,
+            queue_size=8, queue_per_client=4, queue_timeout_seconds=1.0,
+            target_latency_ms=1000, queue_per_source=2
+        )
+        await controller.acquire("10.0.0.1/key-0", "10.0.0.1") # Hold the only slot
+        rotating = [
+            asyncio.create_task(controller.acquire(f"10.0.0.1/key-{i}", "10.0.0.1")) for i in range(1, 4)
+        ]
+        other = asyncio.create_task(controller.acquire("10.0.0.2/install", "10.0.0.2"))
+        await asyncio.sleep(0)
+
+        assert isinstance(rotating[2].exception(), AdmissionRejected)
+        assert controller.stats()["shed_total"]["source_queue_full"] == 1
+        assert not other.done() # Queued, not shed
+
+        for _ in range(3):
+            controller.release(10)
+        await asyncio.wait_for(asyncio.gather(rotating[0], rotating[1], other), timeout=1)
+        assert controller.stats()["queued_sources"] == 0
+
+    asyncio.run(scenario())
+
+def test_background_work_yields_to_interactive_requests():
+    """
+    Test that analysis jobs share the /analyze limit at a lower priority: one slot is
+    kept free for interactive traffic, and queued interactive requests are served first.
+    """
+    async def scenario():
+        controller = AdmissionController(
+            initial_concurrency=2, min_concurrency=1, max_concurrency=2,
+            queue_size=4, queue_per_client=4, queue_timeout_seconds=1.0,
+            target_latency_ms=1000
+        )
+        await controller.acquire_background()
+        second_job = asyncio.create_task(controller.acquire_background())
+        await asyncio.sleep(0)
+        assert not second_job.done() # The other slot is reserved for interactive requests
+
+        await controller.acquire("extension")
+        interactive = asyncio.create_task(controller.acquire("extension"))
+        await asyncio.sleep(0)
+
+        controller.release_background()
+        await asyncio.wait_for(interactive, timeout=1)
+        assert not second_job.done()
+
+        controller.release(10)
+        await asyncio.sleep(0)
+        assert not second_job.done() # The interactive request still running needs the spare slot
+
+        controller.release(10)
+        await asyncio.wait_for(second_job, timeout=1)
+        assert controller.stats()["background_inflight"] == 1
+        assert controller.stats()["admitted_total"] == 2 # Jobs are not counted as /analyze requests
+
+    asyncio.run(scenario())
+
+def test_background_work_never_takes_the_only_slot():
+    """
+    Test that no background work runs at a limit of 1, and that a limit AIMD shrank
+    to 1 is restored once interactive traffic stops, so jobs do not wait forever.
+    """
+    async def scenario():
+        single = AdmissionController(
+            initial_concurrency=1, min_concurrency=1, max_concurrency=1,
+            queue_size=4, queue_per_client=4, queue_timeout_seconds=1.0,
+            target_latency_ms=1000
+        )
+        job = asyncio.create_task(single.acquire_background())
+        await asyncio.sleep(0)
+        assert not job.done()
+        await single.acquire("extension") # The slot is still free for interactive requests
+        single.release(10)
+        await asyncio.sleep(0)
+        assert not job.done()
+        job.cancel()
+
+        shrunk = AdmissionController(
+            initial_concurrency=2, min_concurrency=1, max_concurrency=2,
+            queue_size=4, queue_per_client=4, queue_timeout_seconds=1.0,
+            target_latency_ms=1000
+        )
+        await shrunk.acquire("extension")
+        await shrunk.acquire("extension")
+        shrunk.release(5000) # Over the target latency: the limit drops to 1
+        assert shrunk.limit == 1
+        job = asyncio.create_task(shrunk.acquire_background())
+        await asyncio.sleep(0)
+        assert not job.done()
+
+        shrunk.release(5000)
+        await asyncio.wait_for(job, timeout=1)
+        assert shrunk.limit == 2
+
+    asyncio.run(scenario())
+
+@patch("app.api.analysis_routes.job_service_instance")
+def test_submit_analysis_job_accepted_while_saturated(mock_job_service):
+    """
+    Test that /analyze/jobs still queues submissions while /analyze is shedding:
+    jobs wait for a low-priority slot instead, and only a full job queue refuses them.
+    """
+    saturated = AdmissionController(
+        initial_concurrency=1, min_concurrency=1, max_concurrency=1,
+        queue_size=0, queue_per_client=0, queue_timeout_seconds=0.1,
+        target_latency_ms=1000
+    )
+    asyncio.run(saturated.acquire("bulk-importer")) # Hold the only slot
+    mock_job_service.submit.return_value = "job-123"
+
+    with patch("app.api.analysis_routes.admission_controller_instance", saturated):
+        response = client.post("/api/v1/analyze/jobs", data={"text": "This is a test article."})
+
+    assert response.status_code == 202
+    mock_job_service.submit.assert_called_once()
+
+def test_metrics():
+    """
+    Test that admission and cache counters are exported in the Prometheus text format.
+    """
+    response = client.get("/api/v1/metrics")
+
+    assert response.status_code == 200
+    assert "misinfo_admission_inflight" in response.text
+    assert 'misinfo_admission_shed_total{reason="queue_full"}' in response.text
+
+@patch("app.api.analysis_routes.job_service_instance")
+def test_submit_analysis_job(mock_job_service):
+    """
+    Test that /analyze/jobs queues the request and returns a job ID right away.
+    """
+    mock_job_service.submit.return_value = "job-123"
+
+    response = client.post("/api/v1/analyze/jobs", data={"text": "This is a test article."})
+
+    assert response.status_code == 202
+    assert response.json() == {"job_id": "job-123", "status": "queued"}
+    mock_job_service.submit.assert_called_once_with(
+        params={"text": "This is a test article.", "image_url": None, "image_source_context": None,
+                "explain": False, "source_url": None},
+        image_data=None
+    )
+
+@patch("app.api.analysis_routes.job_service_instance")
+def test_submit_analysis_job_queue_full(mock_job_service):
+    """
+    Test that submissions are refused with 429 once the job queue is full.
+    """
+    mock_job_service.submit.side_effect = JobQueueFullError("The analysis job queue is full.")
+
+    response = client.post("/api/v1/analyze/jobs", data={"text": "This is a test article."})
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+@patch("app.api.analysis_routes.job_service_instance")
+def test_get_analysis_job_not_found(mock_job_service):
+    """
+    Test that an unknown or expired job ID returns 404.
+    """
+    mock_job_service.get.return_value = None
+
+    response = client.get("/api/v1/analyze/jobs/does-not-exist")
+
+    assert response.status_code == 404
+
+def test_request_body_limit_rejects_before_parsing():
+    """
+    Test that RequestBodyLimitMiddleware rejects an oversized body with 413 before
+    the route (and FastAPI's multipart parsing) ever runs.
+    """
+    from fastapi import FastAPI, File, UploadFile
+    from app.api.request_limits import RequestBodyLimitMiddleware
+
+    calls = []
+    limited_app = FastAPI()
+    limited_app.add_middleware(RequestBodyLimitMiddleware, max_body_bytes=1024)
+
+    @limited_app.post("/upload")
+    async def upload(image_file: UploadFile = File(...)):
+        calls.append(image_file.filename)
+        return {"ok": True}
+
+    limited_client = TestClient(limited_app)
+
+    small = limited_client.post("/upload", files={"image_file": ("small.jpg", b"\xff" * 100, "image/jpeg")})
+    assert small.status_code == 200
+
+    big = limited_client.post("/upload", files={"image_file": ("big.jpg", b"\xff" * 4096, "image/jpeg")})
+    assert big.status_code == 413
+    assert calls == ["small.jpg"]
+
+def test_request_body_limit_rejects_chunked_body():
+    """
+    Test that a body sent without a Content-Length (chunked transfer) is cut off
+    with 413 once the bytes streamed in cross the limit.
+    """
+    from fastapi import FastAPI, File, UploadFile
+    from app.api.request_limits import RequestBodyLimitMiddleware
+
+    calls = []
+    limited_app = FastAPI()
+    limited_app.add_middleware(RequestBodyLimitMiddleware, max_body_bytes=1024)
+
+    @limited_app.post("/upload")
+    async def upload(image_file: UploadFile = File(...)):
+        calls.append(image_file.filename)
+        return {"ok": True}
+
+    boundary = "limit-test"
+
+    def multipart_body():
+        yield (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="image_file"; filename="big.jpg"\r\n'
+            "Content-Type: image/jpeg\r\n\r\n"
+        ).encode()
+        for _ in range(8):
+            yield b"\xff" * 512
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    response = TestClient(limited_app).post(
+        "/upload",
+        content=multipart_body(), # A generator body is sent chunked, without a Content-Length
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    )
+
+    assert response.status_code == 413
+    assert calls == []
+
 def test_submit_feedback_success():
     """
     Test a successful request to the /vote endpoint.
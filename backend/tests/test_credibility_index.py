@@ -0,0 +1,143 @@
+import json
+import os
+
+import pytest
+
+from app.core.credibility_index import (
+    DEFAULT_PUBLIC_SUFFIX_LIST, CredibilityIndex, build_index, load_public_suffix_list, normalize_host, registrable_domain,
+)
+
+PUBLIC_SUFFIXES = load_public_suffix_list(DEFAULT_PUBLIC_SUFFIX_LIST)
+
+
+def _build(tmp_path, rows):
+    source = tmp_path / "ratings.json"
+    source.write_text(json.dumps(rows))
+    output = tmp_path / "credibility.idx"
+    build_index([str(source)], str(output))
+    return CredibilityIndex(str(output))
+
+
+def test_normalize_host():
+    """
+    Test that URLs and bare domains normalize to a lowercase host without 'www.'.
+    """
+    assert normalize_host("https://WWW.Example.com:443/path?q=1") == "example.com"
+    assert normalize_host("example.com.") == "example.com"
+    assert normalize_host("") is None
+
+
+def test_registrable_domain():
+    """
+    Test that Public Suffix List rules are respected: multi-label ccTLD suffixes,
+    platform suffixes, wildcard and exception rules, and the single-label default.
+    """
+    assert registrable_domain("news.example.co.uk", PUBLIC_SUFFIXES) == "example.co.uk"
+    assert registrable_domain("a.b.example.com", PUBLIC_SUFFIXES) == "example.com"
+    assert registrable_domain("dept.x.ac.in", PUBLIC_SUFFIXES) == "x.ac.in"
+    assert registrable_domain("news.y.com.vn", PUBLIC_SUFFIXES) == "y.com.vn"
+    assert registrable_domain("foo.blogspot.com", PUBLIC_SUFFIXES) == "foo.blogspot.com"
+    assert registrable_domain("docs.user.github.io", PUBLIC_SUFFIXES) == "user.github.io"
+    assert registrable_domain("a.b.ck", PUBLIC_SUFFIXES) == "a.b.ck"      # *.ck
+    assert registrable_domain("x.www.ck", PUBLIC_SUFFIXES) == "www.ck"    # !www.ck
+    assert registrable_domain("a.b.unlisted", PUBLIC_SUFFIXES) == "b.unlisted"
+    assert registrable_domain("co.uk", PUBLIC_SUFFIXES) == "co.uk"
+
+
+def test_lookup_is_suffix_aware(tmp_path):
+    """
+    Test that subdomains resolve to their registrable domain, and that a more
+    specific subdomain entry takes precedence.
+    """
+    index = _build(tmp_path, [
+        {"domain": "example.co.uk", "score": 0.9, "label": "reliable"},
+        {"domain": "blogs.example.co.uk", "score": 0.4, "label": "mixed"},
+        {"domain": "fake-news.com", "score": 0.1, "label": "unreliable"},
+    ])
+
+    assert len(index) == 3
+
+    rating = index.lookup("https://news.example.co.uk/story")
+    assert rating.matched_domain == "example.co.uk"
+    assert rating.score == 0.9
+    assert rating.label == "reliable"
+
+    assert index.lookup("blogs.example.co.uk").label == "mixed"
+    assert index.lookup("http://www.fake-news.com").score == 0.1
+    assert index.lookup("co.uk") is None
+    assert index.lookup("unknown.org") is None
+
+
+def test_lookup_stops_at_platform_suffixes(tmp_path):
+    """
+    Test that sites on shared hosting platforms are rated on their own, never as the
+    platform, using the suffix rules embedded in the index file.
+    """
+    index = _build(tmp_path, [
+        {"domain": "blogspot.com", "score": 0.9, "label": "reliable"},
+        {"domain": "trusted.blogspot.com", "score": 0.8, "label": "reliable"},
+        {"domain": "github.io", "score": 0.9, "label": "reliable"},
+        {"domain": "ac.in", "score": 0.9, "label": "reliable"},
+        {"domain": "iitb.ac.in", "score": 0.95, "label": "reliable"},
+    ])
+
+    assert "*.ck" in index.suffix_rules and "!www.ck" in index.suffix_rules
+    assert index.lookup("https://anyone.blogspot.com/2024/post.html") is None
+    assert index.lookup("https://www.trusted.blogspot.com/post").matched_domain == "trusted.blogspot.com"
+    assert index.lookup("https://user.github.io/page") is None
+    assert index.lookup("https://blogspot.com").score == 0.9
+    assert index.lookup("cse.iitb.ac.in").matched_domain == "iitb.ac.in"
+    assert index.lookup("other.ac.in") is None
+
+
+def test_build_from_csv(tmp_path):
+    """
+    Test building from a CSV list, where later rows override earlier ones.
+    """
+    source = tmp_path / "ratings.csv"
+    source.write_text("domain,score,label\nreuters.com,0.8,reliable\nreuters.com,0.95,reliable\n")
+    output = tmp_path / "credibility.idx"
+
+    assert build_index([str(source)], str(output)) == 1
+    assert CredibilityIndex(str(output)).lookup("reuters.com").score == 0.95
+
+
+def test_build_rejects_overlong_label(tmp_path):
+    """
+    Test that a label longer than 255 bytes fails the build instead of being truncated.
+    """
+    source = tmp_path / "ratings.json"
+    source.write_text(json.dumps([{"domain": "example.com", "score": 0.5, "label": "é" * 128}]))
+
+    with pytest.raises(ValueError, match="255 bytes"):
+        build_index([str(source)], str(tmp_path / "credibility.idx"))
+    assert not (tmp_path / "credibility.idx").exists()
+
+
+def test_service_hot_reloads_rebuilt_index(tmp_path):
+    """
+    Test that CredibilityService picks up a rebuilt index file without a restart.
+    """
+    from app.core.credibility_service import CredibilityService
+
+    source = tmp_path / "ratings.json"
+    output = tmp_path / "credibility.idx"
+    source.write_text(json.dumps({"example.com": 0.2}))
+    build_index([str(source)], str(output))
+
+    service = CredibilityService(path=str(output), reload_seconds=0)
+    reloads = []
+    service.add_reload_listener(lambda: reloads.append(True))
+    assert service.rate("https://example.com/a")["score"] == 0.2
+    assert reloads == []
+
+    source.write_text(json.dumps({"example.com": 0.8, "reuters.com": 0.9}))
+    build_index([str(source)], str(output))
+    # Make sure the modification time differs even on coarse-grained filesystems.
+    os.utime(output, (output.stat().st_atime, output.stat().st_mtime + 1))
+
+    scored = service.score_request("https://example.com/a", ["https://www.reuters.com/x", "https://unknown.org"])
+    assert scored["article"]["score"] == 0.8
+    assert scored["sources_checked"] == 2
+    assert scored["average_source_score"] == 0.9
+    assert reloads == [True]
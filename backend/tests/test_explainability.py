@@ -0,0 +1,196 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.core.explainability_service import ExplainabilityService
+
+VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "un", "##believable", "shocking", "news", "today"]
+
+
+@pytest.fixture
+def tiny_text_analyzer():
+    """
+    A tiny, randomly initialized sentiment pipeline, built offline, to stand in for the
+    real model while exercising the code around it.
+    """
+    import torch
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, processors
+    from transformers import (
+        DistilBertConfig, DistilBertForSequenceClassification, PreTrainedTokenizerFast, TextClassificationPipeline,
+    )
+
+    # A BERT-style WordPiece tokenizer: "Unbelievable" splits into "un" + "##believable".
+    word_piece = Tokenizer(models.WordPiece(vocab={token: i for i, token in enumerate(VOCAB)}, unk_token="[UNK]"))
+    word_piece.normalizer = normalizers.BertNormalizer(lowercase=True)
+    word_piece.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    word_piece.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", VOCAB.index("[CLS]")), ("[SEP]", VOCAB.index("[SEP]"))]
+    )
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=word_piece, unk_token="[UNK]", pad_token="[PAD]",
+        cls_token="[CLS]", sep_token="[SEP]", mask_token="[MASK]",
+    )
+
+    torch.manual_seed(0)
+    config = DistilBertConfig(
+        vocab_size=len(VOCAB), dim=16, hidden_dim=32, n_layers=1, n_heads=2,
+        id2label={0: "NEGATIVE", 1: "POSITIVE"}, label2id={"NEGATIVE": 0, "POSITIVE": 1},
+    )
+    model = DistilBertForSequenceClassification(config).eval()
+
+    analyzer = TextClassificationPipeline(model=model, tokenizer=tokenizer)
+    with patch("app.core.analysis_service.text_analyzer", analyzer):
+        yield analyzer
+
+
+def _word(text, start, score):
+    return {"text": text, "start": start, "end": start + len(text), "score": score}
+
+
+def test_merge_subword_attributions():
+    """
+    Test that subword scores are summed into whole words using the character
+    offsets, that special tokens are skipped, and that scores are scaled so the
+    strongest word has a magnitude of 1.0.
+    """
+    from app.core.analysis_service import AnalysisService
+
+    text = "Unbelievable news today"
+    # [CLS] un ##believable news today [SEP]
+    offsets = [[0, 0], [0, 2], [2, 12], [13, 17], [18, 23], [0, 0]]
+    scores = [5.0, 0.5, 1.5, -1.0, 0.5, 7.0]
+
+    words = AnalysisService._merge_subword_attributions(text, offsets, scores)
+
+    assert words == [
+        {"start": 0, "end": 12, "score": 1.0, "text": "Unbelievable"},
+        {"start": 13, "end": 17, "score": -0.5, "text": "news"},
+        {"start": 18, "end": 23, "score": 0.25, "text": "today"},
+    ]
+
+
+def test_merge_subword_attributions_all_zero():
+    """
+    Test that all-zero scores are left at zero instead of dividing by zero.
+    """
+    from app.core.analysis_service import AnalysisService
+
+    words = AnalysisService._merge_subword_attributions("a b", [[0, 0], [0, 1], [2, 3], [0, 0]], [0.0, 0.0, 0.0, 0.0])
+
+    assert [word["score"] for word in words] == [0.0, 0.0]
+
+
+def test_run_sentiment_matches_pipeline(tiny_text_analyzer):
+    """
+    Test that the no_grad path returns the same {label, score} as the pipeline it replaced.
+    """
+    from app.core.analysis_service import analysis_service_instance
+
+    text = "Unbelievable shocking news today"
+    sentiment, attributions = analysis_service_instance._run_sentiment(text)
+
+    expected = tiny_text_analyzer(text)[0]
+    assert attributions is None
+    assert sentiment["label"] == expected["label"]
+    assert sentiment["score"] == pytest.approx(expected["score"], abs=1e-6)
+
+
+@patch("app.core.analysis_service.settings.ATTRIBUTION_LATENCY_BUDGET_MS", 60_000)
+def test_run_sentiment_with_attributions(tiny_text_analyzer):
+    """
+    Test that gradient x input attributions come from the same forward pass: the
+    prediction is unchanged, subwords are merged into words, special tokens are left
+    out, scores are normalized, and the shared model's gradients are left untouched.
+    """
+    from app.core.analysis_service import analysis_service_instance
+
+    text = "Unbelievable shocking news today"
+    plain, _ = analysis_service_instance._run_sentiment(text)
+    sentiment, attributions = analysis_service_instance._run_sentiment(text, with_attributions=True)
+
+    assert sentiment["label"] == plain["label"]
+    assert sentiment["score"] == pytest.approx(plain["score"], abs=1e-6)
+    assert "skipped" not in attributions
+    assert [word["text"] for word in attributions["tokens"]] == ["Unbelievable", "shocking", "news", "today"]
+    assert all(param.grad is None for param in tiny_text_analyzer.model.parameters())
+
+    # Recompute gradient x input independently: [CLS] un ##believable shocking news today [SEP]
+    import torch
+    model, tokenizer = tiny_text_analyzer.model, tiny_text_analyzer.tokenizer
+    encoded = tokenizer(text, return_tensors="pt")
+    embeddings = model.get_input_embeddings()(encoded["input_ids"]).detach().requires_grad_(True)
+    logits = model(inputs_embeds=embeddings, attention_mask=encoded["attention_mask"]).logits
+    label_id = int(logits[0].argmax())
+    logits[0, label_id].backward()
+    token_scores = (embeddings.grad * embeddings).sum(dim=-1)[0].tolist()
+    word_scores = [token_scores[1] + token_scores[2]] + token_scores[3:6]
+    peak = max(abs(score) for score in word_scores)
+    expected = [round(score / peak, 4) for score in word_scores]
+
+    assert [word["score"] for word in attributions["tokens"]] == pytest.approx(expected, abs=1e-4)
+    assert max(abs(word["score"]) for word in attributions["tokens"]) == pytest.approx(1.0)
+
+
+@patch("app.core.analysis_service.settings.ATTRIBUTION_LATENCY_BUDGET_MS", 0)
+def test_run_sentiment_skips_attributions_over_budget(tiny_text_analyzer):
+    """
+    Test that attributions are skipped, but the prediction still returned, when the
+    forward pass alone already uses up the latency budget.
+    """
+    from app.core.analysis_service import analysis_service_instance
+
+    text = "Unbelievable shocking news today"
+    sentiment, attributions = analysis_service_instance._run_sentiment(text, with_attributions=True)
+
+    assert sentiment["label"] == tiny_text_analyzer(text)[0]["label"]
+    assert attributions["tokens"] == []
+    assert attributions["skipped"] == "latency budget exceeded"
+
+
+def test_highlight_phrases_groups_adjacent_salient_words():
+    """
+    Test that adjacent salient words form one phrase, while words below the
+    threshold split phrases and are left out.
+    """
+    attributions = {"tokens": [
+        _word("Shocking", 0, 1.0),
+        _word("cover", 9, 0.6),
+        _word("up", 15, 0.5),
+        _word("by", 18, 0.1),
+        _word("officials", 21, 0.7),
+        _word("today", 31, -0.9),
+    ]}
+
+    phrases = ExplainabilityService().highlight_phrases(attributions)
+
+    assert phrases == [
+        {"text": "Shocking cover up", "start": 0, "end": 17, "score": 2.1},
+        {"text": "officials", "start": 21, "end": 30, "score": 0.7},
+    ]
+
+
+def test_highlight_phrases_top_k_ordering():
+    """
+    Test that phrases are ordered from most to least influential and cut at top_k.
+    """
+    attributions = {"tokens": [
+        _word("one", 0, 0.6),
+        _word("and", 4, 0.0),
+        _word("two", 8, 1.0),
+        _word("and", 12, 0.0),
+        _word("three", 16, 0.8),
+    ]}
+
+    phrases = ExplainabilityService().highlight_phrases(attributions, top_k=2)
+
+    assert [phrase["text"] for phrase in phrases] == ["two", "three"]
+
+
+def test_highlight_phrases_without_attributions():
+    """
+    Test that missing or skipped attributions produce no highlights.
+    """
+    service = ExplainabilityService()
+
+    assert service.highlight_phrases(None) == []
+    assert service.highlight_phrases({"tokens": [], "skipped": "latency budget exceeded"}) == []
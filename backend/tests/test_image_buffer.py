@@ -0,0 +1,56 @@
+import tempfile
+from unittest.mock import patch
+
+import pytest
+
+from app.core.image_buffer import ImageBuffer, UploadTooLargeError
+
+
+def _spooled(data: bytes, max_size: int) -> tempfile.SpooledTemporaryFile:
+    # Mirrors the file Starlette spools a multipart upload into.
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_size)
+    spooled.write(data)
+    spooled.seek(0)
+    return spooled
+
+
+def test_from_file_copies_small_in_memory_upload():
+    """
+    Test that a small upload is copied out of the spooled file, so closing the buffer
+    leaves the caller free to close (or keep writing to) its own file.
+    """
+    spooled = _spooled(b"small image", max_size=1024)
+
+    buffer = ImageBuffer.from_file(spooled)
+    assert bytes(buffer.view()) == b"small image"
+    buffer.close()
+
+    spooled.write(b"!") # Would raise BufferError if one of its buffers were still exported
+    spooled.close()
+
+
+@patch("app.core.image_buffer.settings.UPLOAD_SPOOL_MAX_BYTES", 16)
+def test_from_file_maps_large_upload_from_disk():
+    """
+    Test that an upload over the spool threshold is memory-mapped from the file on disk.
+    """
+    data = bytes(range(256)) * 4
+    spooled = _spooled(data, max_size=16)
+
+    buffer = ImageBuffer.from_file(spooled)
+    view = buffer.view()
+    assert isinstance(view.obj, type(buffer._mmap))
+    assert bytes(view) == data
+    buffer.close()
+
+    assert not spooled.closed # Still owned by the caller
+    spooled.close()
+
+
+@patch("app.core.image_buffer.settings.MAX_UPLOAD_BYTES", 8)
+def test_from_file_rejects_oversized_upload():
+    """
+    Test that the upload limit is checked before anything is copied or mapped.
+    """
+    with pytest.raises(UploadTooLargeError):
+        ImageBuffer.from_file(_spooled(b"x" * 64, max_size=1024))
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.admission_control import AdmissionController
+from app.core.job_service import JobService, _utcnow
+from app.database import Base
+from app.models.analysis_job import AnalysisJob, JobStatus
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """A throwaway database shared by every JobService in the test, like replicas sharing one."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with patch("app.core.job_service.SessionLocal", factory):
+        yield factory
+
+
+def _service() -> JobService:
+    controller = AdmissionController(
+        initial_concurrency=2, min_concurrency=1, max_concurrency=2,
+        queue_size=4, queue_per_client=4, queue_timeout_seconds=1.0,
+        target_latency_ms=1000
+    )
+    return JobService(admission=controller)
+
+
+def _job(session_factory, job_id: str) -> AnalysisJob:
+    db = session_factory()
+    try:
+        return db.get(AnalysisJob, job_id)
+    finally:
+        db.close()
+
+
+def test_live_lease_is_not_requeued_by_another_process(session_factory):
+    """
+    Test that a job claimed by one process is left alone when another process starts,
+    and only re-queued once its lease has lapsed.
+    """
+    running, starting = _service(), _service()
+    job_id = running.submit({"text": "This is a test article."})
+
+    claimed = running._claim_next_job()
+    assert claimed[0] == job_id
+    assert _job(session_factory, job_id).claimed_by == running._owner
+
+    starting._requeue_expired_leases()
+    assert _job(session_factory, job_id).status == JobStatus.RUNNING
+    assert starting._claim_next_job() is None
+
+    db = session_factory()
+    db.query(AnalysisJob).update({AnalysisJob.lease_expires_at: _utcnow() - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+
+    starting._requeue_expired_leases()
+    assert _job(session_factory, job_id).status == JobStatus.QUEUED
+    assert starting._claim_next_job()[0] == job_id
+
+
+def test_finish_is_discarded_after_losing_the_lease(session_factory):
+    """
+    Test that a process whose lease lapsed (and whose job was claimed again elsewhere)
+    cannot overwrite the job with its late result.
+    """
+    stale, current = _service(), _service()
+    job_id = stale.submit({"text": "This is a test article."})
+    stale._claim_next_job()
+
+    db = session_factory()
+    db.query(AnalysisJob).update({AnalysisJob.lease_expires_at: _utcnow() - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+    current._requeue_expired_leases()
+    current._claim_next_job()
+
+    stale._finish_job(job_id, JobStatus.FAILED, error="Late result.")
+    assert _job(session_factory, job_id).status == JobStatus.RUNNING
+
+    current._finish_job(job_id, JobStatus.COMPLETED, result="{}")
+    finished = _job(session_factory, job_id)
+    assert finished.status == JobStatus.COMPLETED
+    assert finished.lease_expires_at is None
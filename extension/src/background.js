@@ -2,27 +2,95 @@
 // IMPORTANT: Update this if your backend is deployed elsewhere.
 const API_BASE_URL = 'REPLACE_WITH_YOUR_BACKEND_URL';
 
+// How many pages' results (and their ETags) to remember for revalidation.
+const MAX_CACHED_PAGES = 50;
+
+/**
+ * Loads the stored { etag, result } entry for a page, if any.
+ * @param {string} pageUrl - The URL of the analyzed page.
+ */
+const getCachedAnalysis = async (pageUrl) => {
+  const { analysisCache = {} } = await chrome.storage.local.get('analysisCache');
+  return pageUrl ? analysisCache[pageUrl] : undefined;
+};
+
+/**
+ * Remembers a page's result and ETag, dropping the oldest pages beyond MAX_CACHED_PAGES.
+ */
+const setCachedAnalysis = async (pageUrl, etag, result) => {
+  if (!pageUrl || !etag) return;
+  const { analysisCache = {} } = await chrome.storage.local.get('analysisCache');
+  delete analysisCache[pageUrl];
+  analysisCache[pageUrl] = { etag, result };
+  const pages = Object.keys(analysisCache);
+  pages.slice(0, Math.max(0, pages.length - MAX_CACHED_PAGES)).forEach(page => delete analysisCache[page]);
+  await chrome.storage.local.set({ analysisCache });
+};
+
+/**
+ * Returns this install's client key, generating and storing it on first use.
+ * The backend queues requests fairly per key, so every install keeps the same one
+ * instead of sharing a turn with everyone behind the same proxy or NAT.
+ */
+const getClientKey = async () => {
+  const { clientKey } = await chrome.storage.local.get('clientKey');
+  if (clientKey) return clientKey;
+  const newKey = `extension-${crypto.randomUUID()}`;
+  await chrome.storage.local.set({ clientKey: newKey });
+  return newKey;
+};
+
+/**
+ * Returns the page's hostname. The backend rates sources by domain, so the full URL
+ * (and its path and query) is never sent.
+ * @param {string} pageUrl - The URL of the analyzed page.
+ */
+const sourceHost = (pageUrl) => {
+  try {
+    return pageUrl ? new URL(pageUrl).hostname : undefined;
+  } catch (error) {
+    return undefined;
+  }
+};
+
 /**
  * Fetches analysis from the backend API.
+ * If this page was analyzed before, the stored ETag is sent in If-None-Match,
+ * and a 304 response reuses the stored result instead of downloading it again.
  * @param {object} content - The content to analyze { text, imageUrl }.
+ * @param {string} pageUrl - The URL of the page the content came from.
  */
-const fetchAnalysis = async (content) => {
+const fetchAnalysis = async (content, pageUrl) => {
   try {
+    // The endpoint expects multipart form data, like the web app sends.
+    const formData = new FormData();
+    if (content.text) formData.append('text', content.text);
+    if (content.imageUrl) formData.append('image_url', content.imageUrl);
+    const host = sourceHost(pageUrl);
+    if (host) formData.append('source_url', host);
+
+    const cached = await getCachedAnalysis(pageUrl);
+    const headers = { 'X-Client-Key': await getClientKey() };
+    if (cached) headers['If-None-Match'] = cached.etag;
+
     const response = await fetch(`${API_BASE_URL}/api/v1/analyze`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({
-        text: content.text,
-        image_url: content.imageUrl,
-      }),
+      headers,
+      body: formData,
     });
 
+    if (response.status === 304 && cached) {
+      return cached.result;
+    }
+
     if (!response.ok) {
       const errorData = await response.json();
       throw new Error(errorData.detail || `Server error: ${response.status}`);
     }
 
-    return await response.json();
+    const result = await response.json();
+    await setCachedAnalysis(pageUrl, response.headers.get('ETag'), result);
+    return result;
   } catch (error) {
     console.error("API request failed:", error);
     // Propagate a structured error object
@@ -37,7 +105,8 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
   // Listener for when the content script sends back the extracted page data
   if (message.type === "CONTENT_EXTRACTED") {
     // We've received the content, now call the API
-    fetchAnalysis(message.payload).then(analysisResult => {
+    const pageUrl = sender.tab ? sender.tab.url : undefined;
+    fetchAnalysis(message.payload, pageUrl).then(analysisResult => {
       // Save the result to local storage for the popup to access
       chrome.storage.local.set({ analysisResult: analysisResult });
     });